@@ -0,0 +1,108 @@
+import logging
+import math
+import time
+import redis.asyncio as redis
+from metrics import ESTIMATED_WAIT
+from redis_client import count_completed, task_queue_stats
+
+logger = logging.getLogger(__name__)
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+
+class AdmissionController:
+    """Decides whether a new task is admitted, degraded or rejected.
+
+    The estimated wait of a lane is the number of task entries ahead of a
+    new one (pending and waiting in its own lane, plus the interactive lane
+    for batch tasks) divided by the recent completion rate of all workers.
+    The rate is a moving average of a counter that every gateway adds its
+    persisted results to. It is only updated over periods that had a backlog
+    at both ends, so an idle spell keeps the last busy-period rate, and it
+    never goes below ``min_throughput`` so that an outage with no completions
+    still yields a finite estimate. Stats are
+    refreshed at most every ``refresh_seconds``; if Redis cannot be asked,
+    the last snapshot is used.
+    """
+
+    def __init__(
+        self,
+        degrade_wait: dict[str, float],
+        reject_wait: dict[str, float],
+        min_throughput: float,
+        refresh_seconds: float,
+        max_retry_after: int,
+        alpha: float = 0.3,
+    ):
+        self.degrade_wait = degrade_wait
+        self.reject_wait = reject_wait
+        self.min_throughput = min_throughput
+        self.refresh_seconds = refresh_seconds
+        self.max_retry_after = max_retry_after
+        self.alpha = alpha
+        self.backlog: dict[str, int] = {}
+        self.throughput: float | None = None
+        self._completed = 0
+        self._last_total: int | None = None
+        self._refreshed_at: float | None = None
+        self._refreshing = False
+
+    def record_completion(self):
+        """Count one task finished by a worker; reported on the next refresh."""
+        self._completed += 1
+
+    async def refresh(self):
+        if self._refreshing:
+            return
+        self._refreshing = True
+        completed, self._completed = self._completed, 0
+        try:
+            stats = await task_queue_stats()
+            total = await count_completed(completed)
+        except redis.RedisError as e:
+            self._completed += completed
+            logger.warning(f"Admission stats not refreshed: {e}")
+            return
+        finally:
+            self._refreshing = False
+
+        now = time.monotonic()
+        busy = any(self.backlog.values())
+        self.backlog = {lane: sum(depth.values()) for lane, depth in stats.items()}
+        busy = busy and any(self.backlog.values())
+        # Only a period with work queued throughout measures what the workers can
+        # do; an idle one measures demand and would drag the estimate down.
+        if busy and self._last_total is not None and now > self._refreshed_at:
+            rate = (total - self._last_total) / (now - self._refreshed_at)
+            if self.throughput is None:
+                self.throughput = rate
+            else:
+                self.throughput += self.alpha * (rate - self.throughput)
+        self._last_total = total
+        self._refreshed_at = now
+
+    def estimated_wait(self, lane: str) -> float:
+        ahead = self.backlog.get(lane, 0)
+        if lane != "interactive":
+            # Interactive tasks are served first, so they are ahead of every other lane.
+            ahead += self.backlog.get("interactive", 0)
+        return ahead / max(self.throughput or 0.0, self.min_throughput)
+
+    def retry_after(self, lane: str, wait: float) -> int:
+        """Seconds until the backlog of ``lane`` should be back under the reject threshold."""
+        return max(1, min(self.max_retry_after, math.ceil(wait - self.reject_wait[lane])))
+
+    async def decide(self, lane: str) -> tuple[str, float]:
+        """Return ``(action, estimated wait in seconds)`` for a new task on ``lane``."""
+        stale = self._refreshed_at is None
+        if stale or time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            await self.refresh()
+        wait = self.estimated_wait(lane)
+        ESTIMATED_WAIT.labels(lane).set(wait)
+        if wait >= self.reject_wait[lane]:
+            return REJECT, wait
+        if wait >= self.degrade_wait[lane]:
+            return DEGRADE, wait
+        return ADMIT, wait
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from fastapi import WebSocket
+from metrics import WS_BROADCAST_SECONDS, WS_DROPPED, WS_SEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Close code for clients that cannot keep up ("try again later").
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+
+class ClientConnection:
+    """One WebSocket client with its own bounded outbound queue."""
+
+    def __init__(self, ws: WebSocket, queue_size: int, task_ids: set[str] | None = None):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # None means the client receives events for every task.
+        self.task_ids = task_ids
+        self.writer: asyncio.Task | None = None
+
+    def wants(self, message: dict) -> bool:
+        return self.task_ids is None or message.get("task_id") in self.task_ids
+
+    def subscribe(self, task_ids: list[str]):
+        if self.task_ids is None:
+            self.task_ids = set()
+        self.task_ids.update(task_ids)
+
+    def unsubscribe(self, task_ids: list[str]):
+        if self.task_ids is not None:
+            self.task_ids.difference_update(task_ids)
+
+
+class ConnectionManager:
+    """Fans events out to WebSocket clients without waiting on any of them.
+
+    ``broadcast`` only enqueues; each connection has a writer task that
+    drains its queue. When a client's queue is full, ``partial`` events
+    are dropped (the final ``updated`` event carries the whole summary)
+    and any other event disconnects the client.
+    """
+
+    def __init__(self, queue_size: int, send_timeout: float):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.connections: set[ClientConnection] = set()
+        self._closing: set[asyncio.Task] = set()
+
+    async def connect(self, ws: WebSocket, task_ids: set[str] | None = None) -> ClientConnection:
+        await ws.accept()
+        connection = ClientConnection(ws, self.queue_size, task_ids)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.connections.add(connection)
+        return connection
+
+    def disconnect(self, connection: ClientConnection):
+        if connection not in self.connections:
+            return
+        self.connections.discard(connection)
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    @WS_BROADCAST_SECONDS.time()
+    def broadcast(self, message: dict):
+        for connection in list(self.connections):
+            if not connection.wants(message):
+                continue
+            try:
+                connection.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                if message.get("event") == "partial":
+                    WS_DROPPED.labels("queue_full").inc()
+                    continue
+                logger.warning("Disconnecting slow WebSocket client")
+                WS_DROPPED.labels("slow_client").inc()
+                self.disconnect(connection)
+                task = asyncio.create_task(self._close(connection, SLOW_CLIENT_CLOSE_CODE))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def _write(self, connection: ClientConnection):
+        try:
+            while True:
+                message = await connection.queue.get()
+                with WS_SEND_SECONDS.time():
+                    await asyncio.wait_for(
+                        connection.ws.send_json(message), timeout=self.send_timeout
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket send failed, disconnecting: {e}")
+            self.disconnect(connection)
+            await self._close(connection, SLOW_CLIENT_CLOSE_CODE)
+
+    @staticmethod
+    async def _close(connection: ClientConnection, code: int):
+        try:
+            await connection.ws.close(code=code)
+        except Exception:
+            pass
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, String, Text, DateTime, create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import Column, String, Text, DateTime, Index, event, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 from datetime import datetime
+import logging
 from settings import settings
 
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 
 class Task(Base):
@@ -13,9 +17,97 @@ class Task(Base):
     summary = Column(Text, nullable=True)
     status = Column(String, default="queued")
     created_at = Column(DateTime, default=datetime.utcnow)
+    batch_id = Column(String, nullable=True)
+    # Set when a task is put back from the retention archive; its TTL runs from here.
+    restored_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest first, optionally per status.
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tasks_batch_id_id", "batch_id", "id"),
+    )
+
+
+def async_database_url(url: str) -> str:
+    """Point plain sqlite/postgresql URLs at their asyncio drivers."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+
+database_url = async_database_url(settings.database_url)
+is_sqlite = database_url.startswith("sqlite")
+
+engine = create_async_engine(
+    database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=not is_sqlite,
+)
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+
+if is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+        # WAL lets readers proceed while a write is committing; NORMAL sync is
+        # durable across application crashes and only fsyncs at checkpoints.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        # Lets the retention job return freed pages to the file system bit by bit.
+        # An existing file only switches over with a VACUUM, see init_models.
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.close()
+
+
+def _add_missing_columns(sync_conn, table):
+    """Add nullable columns introduced after ``table`` was created."""
+    existing = {column["name"] for column in inspect(sync_conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(sync_conn.dialect)
+            sync_conn.execute(
+                text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+            )
+
+
+def _create_schema(sync_conn):
+    Base.metadata.create_all(sync_conn)
+    _add_missing_columns(sync_conn, Task.__table__)
+    # create_all skips existing tables, so add indexes introduced later explicitly.
+    for index in Task.__table__.indexes:
+        index.create(sync_conn, checkfirst=True)
+
+
+async def _enable_incremental_vacuum():
+    """Rewrite the SQLite file once so the auto_vacuum=INCREMENTAL pragma takes effect."""
+    async with engine.connect() as conn:
+        if (await conn.execute(text("PRAGMA auto_vacuum"))).scalar() == 2:
+            return
+        logger.info("Running a one-off VACUUM to enable incremental auto-vacuum")
+        raw = await conn.get_raw_connection()
+        # VACUUM cannot run inside a transaction; a script runs on its own.
+        await raw.driver_connection.executescript("VACUUM")
+
 
+async def init_models():
+    async with engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+    if is_sqlite and settings.retention_enabled:
+        await _enable_incremental_vacuum()
 
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
 
-Base.metadata.create_all(engine)
+async def get_session():
+    """FastAPI dependency yielding one session per request."""
+    async with SessionLocal() as session:
+        yield session
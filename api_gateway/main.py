@@ -1,11 +1,35 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from fastapi.staticfiles import StaticFiles
-from db import SessionLocal, Task
-from schemas import TaskResponse, SummarizeRequest
-from redis_client import publish_task, subscribe_results
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import SessionLocal, Task, get_session, init_models
+from schemas import BatchResponse, BatchStats, TaskResponse, TaskStats, SummarizeRequest
+import redis_client
+from redis_client import (
+    publish_task, publish_tasks, publish_fast_task, store_text, store_texts, consume_results,
+    ack_results, publish_event, subscribe_events, claim_inflight, close_inflight,
+    release_inflight, orphaned_followers, forget_followers, claim_periodic_job, task_queue_stats,
+)
+from admission import ADMIT, REJECT, AdmissionController
+from connections import ConnectionManager
+from waiters import FINAL_EVENTS, ResultWaiters
+from metrics import (
+    DB_WRITE_SECONDS, PUBLISH_SECONDS, QUEUE_DEPTH, TASK_LATENCY_SECONDS, TASK_RESULTS,
+    TASKS_COALESCED, TASKS_CREATED, TASKS_SHED, WAITERS, WS_CONNECTIONS,
+)
+from result_writer import ResultWriter
+from retention import make_job
+from settings import settings
+from datetime import datetime
+from typing import Literal
+import base64
+import hashlib
+import time
 import uuid
 import asyncio
+import json
 import logging
 
 
@@ -16,73 +40,669 @@ app = FastAPI(title="Text Summarizer API Gateway")
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-active_connections: set[WebSocket] = set()
+manager = ConnectionManager(
+    queue_size=settings.ws_queue_size,
+    send_timeout=settings.ws_send_timeout,
+)
+WS_CONNECTIONS.set_function(lambda: len(manager.connections))
+
+waiters = ResultWaiters(
+    recent_size=settings.task_result_cache_size,
+    queue_size=settings.sse_queue_size,
+)
+WAITERS.set_function(waiters.count)
+
+# Leader task id of each result stream entry whose in-flight entry is released on commit.
+leaders_by_entry: dict[str, str] = {}
+
+
+async def finish_results(entry_ids: list[str]):
+    """Runs once the results of ``entry_ids`` are committed: release their followers, then ack.
+
+    Until then a redelivered entry finds the same followers again.
+    """
+    leaders = [
+        leaders_by_entry.pop(entry_id) for entry_id in entry_ids if entry_id in leaders_by_entry
+    ]
+    if leaders:
+        await release_inflight(leaders)
+    await ack_results(entry_ids)
+
+
+result_writer = ResultWriter(
+    flush_interval_ms=settings.result_flush_interval_ms,
+    max_batch=settings.result_flush_max_batch,
+    on_flushed=finish_results,
+    max_buffered=settings.result_buffer_max,
+)
+
+admission = AdmissionController(
+    degrade_wait=settings.admission_degrade_wait_seconds,
+    reject_wait=settings.admission_reject_wait_seconds,
+    min_throughput=settings.admission_min_throughput,
+    refresh_seconds=settings.admission_refresh_seconds,
+    max_retry_after=settings.admission_max_retry_after,
+)
+
+retention_job = make_job() if settings.retention_enabled else None
 
 
 async def notify_all(message: dict):
-    for ws in list(active_connections):
-        try:
-            await ws.send_json(message)
-        except Exception:
-            active_connections.remove(ws)
+    """Publish an event to the WebSocket clients of every gateway instance."""
+    with PUBLISH_SECONDS.labels("event").time():
+        await publish_event(message)
 
 
-async def handle_result(message: dict):
+async def on_event(message: dict):
+    manager.broadcast(message)
+    waiters.publish(message)
+
+
+async def handle_result(message: dict, entry_id: str | None = None):
+    # Stop consuming while the database is not keeping up; the entries wait in Redis.
+    await result_writer.wait_for_room()
     task_id = message["task_id"]
     summary = message["summary"]
-    text = message["text"]
+    # Workers report "failed" for tasks they gave up on; other results are "done".
+    status = message.get("status", "done")
+    if not message.get("degraded"):
+        admission.record_completion()
+    TASK_RESULTS.labels("error" if summary.startswith("Error:") else "done").inc()
+    if "enqueued_at" in message:
+        TASK_LATENCY_SECONDS.observe(max(0.0, time.time() - message["enqueued_at"]))
+    if "timings" in message:
+        stages = " ".join(
+            f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in message["timings"].items()
+        )
+        logger.info(f"Task {task_id} trace {message.get('trace_id')}: {stages}")
 
-    db = SessionLocal()
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if task:
-        task.status = "done"
-        task.summary = summary
-        db.commit()
-    db.close()
+    task_ids = [task_id]
+    if settings.coalesce_enabled:
+        task_ids += await close_inflight(task_id)
+        if entry_id is not None:
+            leaders_by_entry[entry_id] = task_id
 
-    await notify_all({
-        "event": "updated",
-        "task_id": task_id,
-        "status": "done",
-        "summary": summary,
-        "text": text
-    })
+    result_writer.add(task_id, status, summary, ack_id=entry_id)
+    for follower_id in task_ids[1:]:
+        result_writer.add(follower_id, status, summary)
+
+    for done_id in task_ids:
+        event = {"event": "updated", "task_id": done_id, "status": status, "summary": summary}
+        if message.get("degraded"):
+            event["degraded"] = True
+        if "batch_id" in message and done_id == task_id:
+            event["batch_id"] = message["batch_id"]
+        await notify_all(event)
+
+
+background_tasks: list[asyncio.Task] = []
+
+
+async def supervise(name: str, consumer, *args):
+    """Keep a long-running Redis consumer alive, restarting it with exponential backoff."""
+    delay = settings.consumer_retry_initial_seconds
+    while True:
+        started = time.monotonic()
+        try:
+            await consumer(*args)
+            reason = "stopped"
+        except Exception as e:
+            reason = f"failed: {e}"
+        if time.monotonic() - started > settings.consumer_retry_max_seconds:
+            delay = settings.consumer_retry_initial_seconds  # it had been running fine
+        logger.error(f"{name} {reason}; restarting in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.consumer_retry_max_seconds)
 
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(subscribe_results(handle_result))
+    await init_models()
+    redis_client.connect()
+    result_writer.start()
+    background_tasks.append(asyncio.create_task(
+        supervise("Result consumer", consume_results, handle_result)
+    ))
+    background_tasks.append(asyncio.create_task(
+        supervise("Event subscriber", subscribe_events, on_event)
+    ))
+    if settings.coalesce_enabled:
+        background_tasks.append(asyncio.create_task(sweep_orphaned_followers()))
+    if retention_job is not None:
+        retention_job.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if retention_job is not None:
+        await retention_job.stop()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await result_writer.stop()
+    await redis_client.close()
+
+
+async def task_message(task_id: str, text: str, priority: str, trace_id: str,
+                       text_hash: str | None = None) -> dict:
+    """The stream message of a task; large texts are stored once and sent by reference."""
+    message = {
+        "task_id": task_id,
+        "priority": priority,
+        "trace_id": trace_id,
+        "enqueued_at": time.time(),
+    }
+    encoded = text.encode("utf-8")
+    if len(encoded) >= settings.claim_check_min_bytes:
+        text_hash = text_hash or hashlib.sha256(encoded).hexdigest()
+        await store_text(text_hash, text)
+        message["text_ref"] = text_hash
+    else:
+        message["text"] = text
+    return message
+
+
+async def republish_orphaned_followers() -> int:
+    """Publish the followers whose leader's in-flight entry expired; returns how many.
+
+    Such a leader took longer than its entry's TTL, so its result will not
+    release them. Followers that are no longer queued are only forgotten.
+    """
+    orphans = await orphaned_followers()
+    if not orphans:
+        return 0
+    async with SessionLocal() as db:
+        rows = (await db.execute(
+            select(Task.id, Task.text).where(Task.id.in_(list(orphans)), Task.status == "queued")
+        )).all()
+    for row in rows:
+        record = orphans[row.id]
+        message = await task_message(row.id, row.text, record["lane"], uuid.uuid4().hex)
+        await publish_task(message, lane=record["lane"], tenant=record["tenant"])
+        TASKS_CREATED.labels(record["lane"]).inc()
+    await forget_followers(list(orphans))
+    if rows:
+        logger.warning(f"Republished {len(rows)} tasks attached to expired in-flight tasks")
+    return len(rows)
+
+
+async def sweep_orphaned_followers():
+    while True:
+        await asyncio.sleep(settings.coalesce_sweep_interval_seconds)
+        try:
+            if await claim_periodic_job("coalesce_sweep", settings.coalesce_sweep_interval_seconds):
+                await republish_orphaned_followers()
+        except Exception as e:
+            logger.error(f"Orphaned follower sweep failed: {e}")
 
 
 @app.post("/summarize", response_model=TaskResponse)
-async def create_task(request: SummarizeRequest):
-    db = SessionLocal()
+async def create_task(
+    request: SummarizeRequest,
+    http_request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_session),
+):
     task_id = str(uuid.uuid4())
+    # Reuse the caller's trace id so the task can be followed across services.
+    trace_id = http_request.headers.get("X-Trace-Id") or uuid.uuid4().hex
+    response.headers["X-Trace-Id"] = trace_id
+
+    action = ADMIT
+    if settings.admission_enabled:
+        action, wait = await admission.decide(request.priority)
+        response.headers["X-Estimated-Wait"] = f"{wait:.1f}"
+    degraded = action != ADMIT and request.allow_degraded
+    if action == REJECT and not degraded:
+        TASKS_SHED.labels(request.priority, "rejected").inc()
+        raise HTTPException(
+            status_code=429,
+            detail=f"Task queue is full, estimated wait {wait:.0f}s",
+            headers={"Retry-After": str(admission.retry_after(request.priority, wait))},
+        )
+    if degraded:
+        TASKS_SHED.labels(request.priority, "degraded").inc()
+        response.headers["X-Degraded"] = "true"
+
     task = Task(id=task_id, text=request.text)
-    db.add(task)
-    db.commit()
-    db.close()
+    with DB_WRITE_SECONDS.labels("insert").time():
+        db.add(task)
+        await db.commit()
+
+    encoded = request.text.encode("utf-8")
+    text_hash = hashlib.sha256(encoded).hexdigest()
+    # Without an explicit client id, callers are told apart by address.
+    tenant = request.client_id or (http_request.client.host if http_request.client else "default")
+    leader_id = None
+    # Degraded tasks get a different summary, so identical full requests must not attach to them.
+    if settings.coalesce_enabled and not degraded:
+        leader_id = await claim_inflight(text_hash, task_id, request.priority, tenant)
 
-    await publish_task({"task_id": task_id, "text": request.text})
-    await notify_all({"task_id": task_id, "status": "queued", "text": request.text})
+    if leader_id is None:
+        message = await task_message(task_id, request.text, request.priority, trace_id, text_hash)
+        with PUBLISH_SECONDS.labels("task").time():
+            if degraded:
+                await publish_fast_task(message)
+            else:
+                await publish_task(message, lane=request.priority, tenant=tenant)
+        TASKS_CREATED.labels(request.priority).inc()
+    else:
+        TASKS_COALESCED.inc()
+        logger.info(f"Task {task_id} attached to in-flight task {leader_id}")
+    await notify_all({
+        "event": "created",
+        "task_id": task_id,
+        "status": "queued",
+        "text": request.text[:settings.event_text_preview],
+    })
 
     return TaskResponse(task_id=task_id, status="queued")
 
 
+async def read_batch_texts(http_request: Request) -> list[str]:
+    """Parse a batch body: a JSON array, or NDJSON (``application/x-ndjson``) read as it streams.
+
+    Each item is either a string or an object with a ``text`` field.
+    """
+    def parse_item(item, position: int) -> str:
+        if isinstance(item, dict):
+            item = item.get("text")
+        if not isinstance(item, str):
+            raise HTTPException(status_code=400, detail=f"Item {position} has no text")
+        return item
+
+    def check_size(count: int):
+        if count > settings.batch_max_items:
+            raise HTTPException(
+                status_code=413, detail=f"A batch holds at most {settings.batch_max_items} items"
+            )
+
+    if "ndjson" not in http_request.headers.get("content-type", ""):
+        try:
+            items = json.loads(await http_request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array")
+        check_size(len(items))
+        return [parse_item(item, position) for position, item in enumerate(items)]
+
+    texts = []
+
+    def parse_line(line: bytes):
+        if line.strip():
+            try:
+                item = json.loads(line)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Item {len(texts)} is not valid JSON")
+            texts.append(parse_item(item, len(texts)))
+            check_size(len(texts))
+
+    pending = b""
+    async for chunk in http_request.stream():
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            parse_line(line)
+    parse_line(pending)
+    return texts
+
+
+@app.post("/summarize/batch", response_model=BatchResponse)
+async def create_batch(
+    http_request: Request,
+    response: Response,
+    priority: Literal["interactive", "batch"] = "batch",
+    client_id: str | None = None,
+    db: AsyncSession = Depends(get_session),
+):
+    """Queue many documents at once.
+
+    All rows are inserted in one transaction and the tasks are enqueued with
+    pipelined XADDs. Identical texts are not coalesced. Task ids are
+    ``{batch_id}-{index:08d}`` in input order; follow progress with
+    ``GET /batches/{batch_id}`` and download summaries from
+    ``GET /batches/{batch_id}/results``.
+    """
+    batch_id = uuid.uuid4().hex
+    trace_id = http_request.headers.get("X-Trace-Id") or uuid.uuid4().hex
+    response.headers["X-Trace-Id"] = trace_id
+    if settings.admission_enabled:
+        action, wait = await admission.decide(priority)
+        if action == REJECT:
+            TASKS_SHED.labels(priority, "rejected").inc()
+            raise HTTPException(
+                status_code=429,
+                detail=f"Task queue is full, estimated wait {wait:.0f}s",
+                headers={"Retry-After": str(admission.retry_after(priority, wait))},
+            )
+
+    texts = await read_batch_texts(http_request)
+    if not texts:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    # Entries beyond the stream's MAXLEN would be trimmed before any worker reads them.
+    if admission.backlog.get(priority, 0) + len(texts) > settings.task_stream_maxlen:
+        raise HTTPException(
+            status_code=429,
+            detail="Batch does not fit in the task queue",
+            headers={"Retry-After": str(settings.admission_max_retry_after)},
+        )
+
+    task_ids = [f"{batch_id}-{index:08d}" for index in range(len(texts))]
+    with DB_WRITE_SECONDS.labels("batch_insert").time():
+        for start in range(0, len(texts), settings.batch_insert_chunk):
+            end = start + settings.batch_insert_chunk
+            await db.execute(insert(Task), [
+                {"id": task_id, "text": text, "batch_id": batch_id}
+                for task_id, text in zip(task_ids[start:end], texts[start:end])
+            ])
+        await db.commit()
+
+    enqueued_at = time.time()
+    messages, blobs = [], {}
+    for task_id, text in zip(task_ids, texts):
+        message = {
+            "task_id": task_id,
+            "batch_id": batch_id,
+            "priority": priority,
+            "trace_id": trace_id,
+            "enqueued_at": enqueued_at,
+        }
+        encoded = text.encode("utf-8")
+        if len(encoded) >= settings.claim_check_min_bytes:
+            text_hash = hashlib.sha256(encoded).hexdigest()
+            blobs[text_hash] = text
+            message["text_ref"] = text_hash
+        else:
+            message["text"] = text
+        messages.append(message)
+    tenant = client_id or (http_request.client.host if http_request.client else "default")
+    with PUBLISH_SECONDS.labels("batch").time():
+        await store_texts(blobs)
+        await publish_tasks(messages, lane=priority, tenant=tenant)
+    TASKS_CREATED.labels(priority).inc(len(messages))
+    logger.info(f"Batch {batch_id}: queued {len(messages)} tasks")
+
+    await notify_all({"event": "batch_created", "batch_id": batch_id, "count": len(messages)})
+    return BatchResponse(batch_id=batch_id, count=len(messages), status="queued")
+
+
+async def load_batch_stats(batch_id: str) -> BatchStats:
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(Task.status, func.count()).where(Task.batch_id == batch_id).group_by(Task.status)
+        )
+    by_status = {status: count for status, count in result.all()}
+    if not by_status:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return BatchStats(
+        batch_id=batch_id,
+        total=sum(by_status.values()),
+        by_status=by_status,
+        done="queued" not in by_status,
+    )
+
+
+@app.get("/batches/{batch_id}", response_model=BatchStats)
+async def batch_stats(batch_id: str):
+    """Return task counts per status for one batch."""
+    return await load_batch_stats(batch_id)
+
+
+@app.get("/batches/{batch_id}/events")
+async def batch_events(batch_id: str):
+    """Server-Sent Events for one batch.
+
+    Starts with a ``progress`` event (the same body as ``GET /batches/{batch_id}``),
+    then relays the ``updated`` event of each task and sends a fresh
+    ``progress`` when the batch looks finished or the stream has been idle
+    for ``sse_keepalive_seconds``. The stream ends once no task is queued.
+    """
+    queue = waiters.subscribe(batch_id)
+    try:
+        progress = await load_batch_stats(batch_id)
+    except HTTPException:
+        waiters.unsubscribe(batch_id, queue)
+        raise
+
+    async def stream():
+        nonlocal progress
+        try:
+            yield sse_event("progress", progress.model_dump())
+            remaining = progress.by_status.get("queued", 0)
+            while not progress.done:
+                try:
+                    message = await asyncio.wait_for(queue.get(), settings.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    message = {}
+                if message is None:
+                    return
+                if message:
+                    yield sse_event(message["event"], message)
+                    remaining -= message["event"] == "updated"
+                    if remaining > 0:
+                        continue
+                progress = await load_batch_stats(batch_id)
+                remaining = progress.by_status.get("queued", 0)
+                yield sse_event("progress", progress.model_dump())
+        finally:
+            waiters.unsubscribe(batch_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/batches/{batch_id}/results")
+async def batch_results(batch_id: str, status: str | None = None):
+    """Stream the tasks of a batch as NDJSON lines in input order.
+
+    Each line is ``{"task_id", "status", "summary"}``; pass ``status=done``
+    to skip tasks that are still queued.
+    """
+    async def fetch_page(after: str) -> list:
+        query = select(Task.id, Task.status, Task.summary).where(
+            Task.batch_id == batch_id, Task.id > after
+        )
+        if status is not None:
+            query = query.where(Task.status == status)
+        query = query.order_by(Task.id).limit(settings.batch_results_page)
+        async with SessionLocal() as db:
+            return (await db.execute(query)).all()
+
+    first_page = await fetch_page("")
+    if not first_page:
+        async with SessionLocal() as db:
+            exists = await db.scalar(select(Task.id).where(Task.batch_id == batch_id).limit(1))
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Batch not found")
+
+    async def lines():
+        page = first_page
+        while page:
+            yield "".join(
+                json.dumps({"task_id": t.id, "status": t.status, "summary": t.summary}) + "\n"
+                for t in page
+            )
+            if len(page) < settings.batch_results_page:
+                break
+            page = await fetch_page(page[-1].id)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def encode_cursor(created_at: datetime, task_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{task_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, task_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), task_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/tasks", response_model=list[TaskResponse])
-async def list_tasks():
-    """Return all tasks from database."""
-    db = SessionLocal()
-    tasks = db.query(Task).order_by(Task.created_at.desc()).all()
-    db.close()
+async def list_tasks(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    preview: int | None = Query(None, ge=0, description="Return only the first N characters of text"),
+    db: AsyncSession = Depends(get_session),
+):
+    """Return one page of tasks, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to get
+    the next page; the header is absent on the last page.
+    """
+    text_column = Task.text if preview is None else func.substr(Task.text, 1, preview)
+    query = select(Task.id, Task.status, Task.summary, Task.created_at, text_column.label("text"))
+    if status is not None:
+        query = query.where(Task.status == status)
+    if cursor is not None:
+        query = query.where(tuple_(Task.created_at, Task.id) < tuple_(*decode_cursor(cursor)))
+    query = query.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+
     return [
         TaskResponse(
-            task_id=t.id, status=t.status, summary=t.summary or "", text=t.text
+            task_id=t.id, status=t.status, summary=t.summary or "", text=t.text,
+            created_at=t.created_at,
         )
-        for t in tasks
+        for t in rows
     ]
 
 
+@app.get("/tasks/stats", response_model=TaskStats)
+async def task_stats(db: AsyncSession = Depends(get_session)):
+    """Return task counts per status."""
+    result = await db.execute(select(Task.status, func.count()).group_by(Task.status))
+    by_status = {status: count for status, count in result.all()}
+    return TaskStats(total=sum(by_status.values()), by_status=by_status)
+
+
+def task_etag(state: dict) -> str:
+    digest = hashlib.sha256(json.dumps([state["status"], state["summary"]]).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(http_request: Request, etag: str) -> bool:
+    header = http_request.headers.get("If-None-Match")
+    if header is None:
+        return False
+    return header.strip() == "*" or etag in map(str.strip, header.split(","))
+
+
+async def load_task_state(task_id: str) -> dict | None:
+    """Status and summary of a task, from recent result events or else the database."""
+    state = waiters.recent(task_id)
+    if state is None:
+        # A session of its own: parked requests must not hold pool connections.
+        async with SessionLocal() as db:
+            row = (await db.execute(
+                select(Task.status, Task.summary).where(Task.id == task_id)
+            )).first()
+        if row is not None:
+            state = {"status": row.status, "summary": row.summary or ""}
+    return state
+
+
+@app.get("/tasks/{task_id}", response_model=TaskResponse)
+async def get_task(
+    task_id: str,
+    http_request: Request,
+    response: Response,
+    wait: float = Query(0, ge=0, le=settings.task_wait_max_seconds),
+):
+    """Return the status and summary of one task.
+
+    With ``wait`` (seconds) an unfinished task is answered as soon as its
+    result arrives, or with its current state when the time is up. The
+    response carries an ``ETag``; a matching ``If-None-Match`` gets 304.
+    """
+    future = waiters.future(task_id) if wait else None
+    try:
+        state = await load_task_state(task_id)
+        if state is not None and future is not None and state["status"] == "queued":
+            try:
+                message = await asyncio.wait_for(future, wait)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                state = None if message["event"] == "deleted" else {
+                    "status": message["status"], "summary": message["summary"],
+                }
+    finally:
+        if future is not None:
+            waiters.discard_future(task_id, future)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    etag = task_etag(state)
+    if etag_matches(http_request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return TaskResponse(task_id=task_id, **state)
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/tasks/{task_id}/events")
+async def task_events(task_id: str):
+    """Server-Sent Events for one task.
+
+    Starts with a ``state`` event, relays ``partial`` events while the
+    worker streams the summary and ends after the final ``updated`` (or
+    ``deleted``) event. Comment lines keep idle connections open.
+    """
+    queue = waiters.subscribe(task_id)
+    state = await load_task_state(task_id)
+    if state is None:
+        waiters.unsubscribe(task_id, queue)
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def stream():
+        try:
+            yield sse_event("state", {"task_id": task_id, **state})
+            if state["status"] != "queued":
+                return
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), settings.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield sse_event(message["event"], message)
+                if message["event"] in FINAL_EVENTS:
+                    return
+        finally:
+            waiters.unsubscribe(task_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of this gateway instance."""
+    for lane, depth in (await task_queue_stats()).items():
+        for state, count in depth.items():
+            QUEUE_DEPTH.labels(lane, state).set(count)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index():
     with open("static/index.html") as f:
@@ -90,27 +710,40 @@ async def index():
 
 
 @app.delete("/tasks/{task_id}")
-async def delete_task(task_id: str):
-    db = SessionLocal()
-    task = db.query(Task).filter(Task.id == task_id).first()
+async def delete_task(task_id: str, db: AsyncSession = Depends(get_session)):
+    task = await db.get(Task, task_id)
     if task:
-        db.delete(task)
-        db.commit()
-        db.close()
+        await db.delete(task)
+        await db.commit()
         await notify_all({"event": "deleted", "task_id": task_id})
         return {"ok": True}
-    db.close()
     return {"ok": False, "error": "not_found"}
 
 
 @app.websocket("/ws")
-async def websocket_endpoint(ws: WebSocket):
-    await ws.accept()
-    active_connections.add(ws)
+async def websocket_endpoint(ws: WebSocket, task_ids: str | None = None):
+    """Push task events to the client.
+
+    Without ``task_ids`` the client receives events for every task. It can
+    narrow that with ``?task_ids=a,b`` or by sending
+    ``{"action": "subscribe" | "unsubscribe", "task_ids": [...]}``.
+    """
+    initial = {t for t in task_ids.split(",") if t} if task_ids else None
+    connection = await manager.connect(ws, initial)
     logger.info("WebSocket connected")
     try:
         while True:
-            await ws.receive_text()
+            try:
+                command = json.loads(await ws.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(command, dict):
+                continue
+            if command.get("action") == "subscribe":
+                connection.subscribe(command.get("task_ids", []))
+            elif command.get("action") == "unsubscribe":
+                connection.unsubscribe(command.get("task_ids", []))
     except WebSocketDisconnect:
-        active_connections.remove(ws)
         logger.info("WebSocket disconnected")
+    finally:
+        manager.disconnect(connection)
@@ -0,0 +1,57 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Buckets from 1 ms to 10 s for the gateway's own stages.
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# End-to-end task latency includes model time, so it needs a longer tail.
+TASK_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+DB_WRITE_SECONDS = Histogram(
+    "gateway_db_write_seconds", "Time spent writing to the database.",
+    ["operation"], buckets=FAST_BUCKETS,
+)
+PUBLISH_SECONDS = Histogram(
+    "gateway_publish_seconds", "Time spent publishing to Redis.",
+    ["target"], buckets=FAST_BUCKETS,
+)
+WS_BROADCAST_SECONDS = Histogram(
+    "gateway_ws_broadcast_seconds", "Time to queue one event for every local WebSocket client.",
+    buckets=FAST_BUCKETS,
+)
+WS_SEND_SECONDS = Histogram(
+    "gateway_ws_send_seconds", "Time to send one event to one WebSocket client.",
+    buckets=FAST_BUCKETS,
+)
+TASK_LATENCY_SECONDS = Histogram(
+    "gateway_task_latency_seconds", "Time from task submission to its result reaching a gateway.",
+    buckets=TASK_BUCKETS,
+)
+
+WS_CONNECTIONS = Gauge("gateway_ws_connections", "Connected WebSocket clients.")
+WAITERS = Gauge(
+    "gateway_result_waiters", "Long-poll requests and SSE streams waiting for task events."
+)
+QUEUE_DEPTH = Gauge(
+    "gateway_queue_depth",
+    "Task stream entries per lane: 'pending' are delivered but unacknowledged, "
+    "'waiting' are not delivered yet (Redis 7+ only).",
+    ["lane", "state"],
+)
+ESTIMATED_WAIT = Gauge(
+    "gateway_estimated_wait_seconds", "Estimated queueing time of a new task per lane.", ["lane"]
+)
+
+TASKS_CREATED = Counter("gateway_tasks_created_total", "Tasks accepted.", ["lane"])
+TASKS_COALESCED = Counter(
+    "gateway_tasks_coalesced_total", "Tasks attached to an identical in-flight task."
+)
+TASKS_SHED = Counter(
+    "gateway_tasks_shed_total", "Tasks degraded or rejected by admission control.",
+    ["lane", "action"],
+)
+TASKS_ARCHIVED = Counter(
+    "gateway_tasks_archived_total", "Expired tasks moved to the archive.", ["status"]
+)
+TASK_RESULTS = Counter("gateway_task_results_total", "Results received.", ["outcome"])
+WS_DROPPED = Counter(
+    "gateway_ws_dropped_total", "Events not delivered to a WebSocket client.", ["reason"]
+)
@@ -1,20 +1,349 @@
 import json
+import logging
+import os
+import socket
+import time
 import redis.asyncio as redis
+import zstandard
 from settings import settings
 
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+logger = logging.getLogger(__name__)
 
-TASK_CHANNEL = "tasks"
-RESULT_CHANNEL = "results"
+# Created by ``connect`` on application startup and closed by ``close`` on shutdown:
+# pooled connections belong to the event loop that opened them.
+redis_client: redis.Redis | None = None
+# Compressed text blobs are binary, so they go through a client that does not decode.
+blob_client: redis.Redis | None = None
 
+# Priority lanes, each backed by its own stream.
+TASK_STREAMS = {"interactive": "tasks", "batch": "tasks:batch"}
+# Degraded tasks, answered by the workers' extractive fast path.
+FAST_STREAM = "tasks:fast"
+TASK_GROUP = "workers"
+RESULT_STREAM = "results"
+RESULT_GROUP = "gateways"
+EVENT_CHANNEL = "events"
+BLOB_PREFIX = "blob:"
+# Results persisted by all gateways together, for the admission throughput estimate.
+COMPLETED_KEY = "stats:completed"
 
-async def publish_task(task_data: dict):
-    await redis_client.publish(TASK_CHANNEL, json.dumps(task_data))
+CONSUMER_NAME = settings.gateway_name or f"{socket.gethostname()}-{os.getpid()}"
 
 
-async def subscribe_results(callback):
+def connect():
+    global redis_client, blob_client, _claim_inflight, _close_inflight, _release_inflight
+    # No socket timeout: blocking stream reads wait longer than redis-py's default of 5 s.
+    redis_client = redis.from_url(settings.redis_url, decode_responses=True, socket_timeout=None)
+    blob_client = redis.from_url(settings.redis_url)
+    _claim_inflight = redis_client.register_script(_CLAIM_INFLIGHT)
+    _close_inflight = redis_client.register_script(_CLOSE_INFLIGHT)
+    _release_inflight = redis_client.register_script(_RELEASE_INFLIGHT)
+
+
+async def close():
+    global redis_client, blob_client
+    for client in (redis_client, blob_client):
+        if client is not None:
+            await client.aclose()
+    redis_client = blob_client = None
+
+
+async def publish_task(task_data: dict, lane: str = "interactive", tenant: str = "default"):
+    """Queue a task on its priority lane; workers schedule fairly by ``tenant``."""
+    await redis_client.xadd(
+        TASK_STREAMS[lane],
+        {"data": json.dumps(task_data), "tenant": tenant},
+        maxlen=settings.task_stream_maxlen,
+        approximate=True,
+    )
+
+
+async def publish_tasks(messages: list[dict], lane: str = "interactive", tenant: str = "default"):
+    """Queue many tasks with pipelined XADDs, ``settings.publish_pipeline_size`` per round trip."""
+    for start in range(0, len(messages), settings.publish_pipeline_size):
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for task_data in messages[start:start + settings.publish_pipeline_size]:
+                pipe.xadd(
+                    TASK_STREAMS[lane],
+                    {"data": json.dumps(task_data), "tenant": tenant},
+                    maxlen=settings.task_stream_maxlen,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+
+async def publish_fast_task(task_data: dict):
+    await redis_client.xadd(
+        FAST_STREAM,
+        {"data": json.dumps(task_data)},
+        maxlen=settings.task_stream_maxlen,
+        approximate=True,
+    )
+
+
+_compressor = zstandard.ZstdCompressor(level=settings.blob_compression_level)
+
+
+async def store_text(text_hash: str, text: str):
+    """Store ``text`` zstd-compressed under its content hash.
+
+    A blob that is already stored only gets its TTL refreshed, so the same
+    document submitted again is not uploaded twice.
+    """
+    key = f"{BLOB_PREFIX}{text_hash}"
+    if await blob_client.expire(key, settings.blob_ttl_seconds):
+        return
+    await blob_client.set(
+        key, _compressor.compress(text.encode("utf-8")), ex=settings.blob_ttl_seconds
+    )
+
+
+async def store_texts(texts: dict[str, str]):
+    """Store many texts like ``store_text`` (without the TTL refresh shortcut), pipelined."""
+    items = list(texts.items())
+    for start in range(0, len(items), settings.publish_pipeline_size):
+        async with blob_client.pipeline(transaction=False) as pipe:
+            for text_hash, text in items[start:start + settings.publish_pipeline_size]:
+                pipe.set(
+                    f"{BLOB_PREFIX}{text_hash}",
+                    _compressor.compress(text.encode("utf-8")),
+                    ex=settings.blob_ttl_seconds,
+                )
+            await pipe.execute()
+
+
+async def task_queue_stats() -> dict[str, dict[str, int]]:
+    """Per-lane counts of task entries that are pending (delivered, not acked) or still waiting.
+
+    ``waiting`` relies on the consumer group lag reported by Redis 7+.
+    """
+    stats = {}
+    for lane, stream in TASK_STREAMS.items():
+        try:
+            groups = await redis_client.xinfo_groups(stream)
+        except redis.ResponseError:
+            continue  # the stream does not exist yet
+        for group in groups:
+            if group["name"] == TASK_GROUP:
+                stats[lane] = {"pending": group["pending"]}
+                if group.get("lag") is not None:
+                    stats[lane]["waiting"] = group["lag"]
+    return stats
+
+
+async def count_completed(completed: int) -> int:
+    """Add this gateway's completed tasks to the shared counter and return its total."""
+    return await redis_client.incrby(COMPLETED_KEY, completed)
+
+
+async def claim_periodic_job(name: str, seconds: float) -> bool:
+    """Claim the next ``seconds`` of job ``name`` for this instance; False if another has it."""
+    return bool(await redis_client.set(
+        f"job:{name}", CONSUMER_NAME, nx=True, px=max(1, int(seconds * 1000))
+    ))
+
+
+async def ensure_result_group():
+    """Create the gateway consumer group (and the stream) if it does not exist yet."""
+    try:
+        await redis_client.xgroup_create(RESULT_STREAM, RESULT_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def _process_result(callback, entry_id: str, fields: dict):
+    try:
+        await callback(json.loads(fields["data"]), entry_id)
+    except Exception as e:
+        # Left pending; reclaimed and retried later.
+        logger.error(f"Result entry {entry_id} failed: {e}")
+
+
+async def consume_results(callback):
+    """Deliver each worker result to exactly one gateway instance.
+
+    ``callback(message, entry_id)`` is responsible for acknowledging the
+    entry with ``ack_results`` once the result is persisted. Entries left
+    pending by a gateway that died are reclaimed after they go idle.
+    """
+    await ensure_result_group()
+    next_reclaim = 0.0
+    while True:
+        if time.monotonic() >= next_reclaim:
+            start_id = "0-0"
+            while True:
+                # Redis 7 adds a third element (deleted ids); 6.2 returns two.
+                start_id, entries, *_deleted = await redis_client.xautoclaim(
+                    RESULT_STREAM,
+                    RESULT_GROUP,
+                    CONSUMER_NAME,
+                    min_idle_time=settings.result_reclaim_idle_ms,
+                    start_id=start_id,
+                    count=settings.result_read_count,
+                )
+                for entry_id, fields in entries:
+                    await _process_result(callback, entry_id, fields)
+                if start_id == "0-0":
+                    break
+            next_reclaim = time.monotonic() + settings.result_reclaim_interval_seconds
+
+        response = await redis_client.xreadgroup(
+            RESULT_GROUP,
+            CONSUMER_NAME,
+            {RESULT_STREAM: ">"},
+            count=settings.result_read_count,
+            block=settings.result_block_ms,
+        )
+        for _stream, entries in response or []:
+            for entry_id, fields in entries:
+                await _process_result(callback, entry_id, fields)
+
+
+async def ack_results(entry_ids: list[str]):
+    await redis_client.xack(RESULT_STREAM, RESULT_GROUP, *entry_ids)
+
+
+async def publish_event(event: dict):
+    """Broadcast a compact event to every gateway instance."""
+    await redis_client.publish(EVENT_CHANNEL, json.dumps(event))
+
+
+async def subscribe_events(callback):
     pubsub = redis_client.pubsub()
-    await pubsub.subscribe(RESULT_CHANNEL)
-    async for message in pubsub.listen():
-        if message["type"] == "message":
-            await callback(json.loads(message["data"]))
+    try:
+        await pubsub.subscribe(EVENT_CHANNEL)
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                await callback(json.loads(message["data"]))
+    finally:
+        await pubsub.aclose()
+
+
+INFLIGHT_PREFIX = "inflight:"
+# Hash of follower task id -> its leader, lane and tenant, for the orphan sweep.
+ATTACHED_KEY = f"{INFLIGHT_PREFIX}attached"
+
+# KEYS: text key, task key, attached key;
+# ARGV: key prefix, task_id, ttl, "lane:text_hash", follower record (JSON without the leader).
+# Returns the leader task id if the text is already in flight, else nil.
+_CLAIM_INFLIGHT = """
+local leader = redis.call('GET', KEYS[1])
+if leader then
+    local followers_key = ARGV[1] .. 'followers:' .. leader
+    redis.call('RPUSH', followers_key, ARGV[2])
+    redis.call('EXPIRE', followers_key, ARGV[3])
+    local record = cjson.decode(ARGV[5])
+    record['leader'] = leader
+    redis.call('HSET', KEYS[3], ARGV[2], cjson.encode(record))
+    return leader
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[4], 'EX', ARGV[3])
+return false
+"""
+
+# KEYS: task key, followers key; ARGV: key prefix, task_id.
+# Stops new tasks from attaching to the leader; returns its followers.
+_CLOSE_INFLIGHT = """
+local text_key_suffix = redis.call('GET', KEYS[1])
+if text_key_suffix then
+    local text_key = ARGV[1] .. 'text:' .. text_key_suffix
+    if redis.call('GET', text_key) == ARGV[2] then
+        redis.call('DEL', text_key)
+    end
+end
+return redis.call('LRANGE', KEYS[2], 0, -1)
+"""
+
+# KEYS: task key, followers key, attached key.
+_RELEASE_INFLIGHT = """
+local followers = redis.call('LRANGE', KEYS[2], 0, -1)
+if #followers > 0 then
+    redis.call('HDEL', KEYS[3], unpack(followers))
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+return #followers
+"""
+
+
+def inflight_ttl(lane: str) -> int:
+    # Outlive the longest queue wait admission control accepts on the lane, plus the work.
+    return int(settings.admission_reject_wait_seconds.get(lane, 0) + settings.coalesce_ttl_seconds)
+
+
+async def claim_inflight(text_hash: str, task_id: str, lane: str = "interactive",
+                         tenant: str = "default") -> str | None:
+    """Register ``task_id`` as the job for ``text_hash`` on ``lane``.
+
+    Returns None if the caller is now the leader and must publish the
+    task, or the id of the leader task it was attached to. Tasks only
+    attach to a leader of the same lane.
+    """
+    inflight_key = f"{lane}:{text_hash}"
+    return await _claim_inflight(
+        keys=[
+            f"{INFLIGHT_PREFIX}text:{inflight_key}",
+            f"{INFLIGHT_PREFIX}task:{task_id}",
+            ATTACHED_KEY,
+        ],
+        args=[
+            INFLIGHT_PREFIX, task_id, inflight_ttl(lane), inflight_key,
+            json.dumps({"lane": lane, "tenant": tenant}),
+        ],
+    )
+
+
+async def close_inflight(task_id: str) -> list[str]:
+    """Stop attaching new tasks to leader ``task_id`` and return its followers.
+
+    Safe to repeat: a redelivered result gets the same followers until
+    ``release_inflight`` runs.
+    """
+    return await _close_inflight(
+        keys=[f"{INFLIGHT_PREFIX}task:{task_id}", f"{INFLIGHT_PREFIX}followers:{task_id}"],
+        args=[INFLIGHT_PREFIX, task_id],
+    )
+
+
+async def release_inflight(task_ids: list[str]):
+    """Drop the in-flight entries of leaders whose results, and their followers', are committed."""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for task_id in task_ids:
+            await _release_inflight(
+                keys=[
+                    f"{INFLIGHT_PREFIX}task:{task_id}",
+                    f"{INFLIGHT_PREFIX}followers:{task_id}",
+                    ATTACHED_KEY,
+                ],
+                client=pipe,
+            )
+        await pipe.execute()
+
+
+async def orphaned_followers() -> dict[str, dict]:
+    """Followers whose leader's in-flight entry expired before its result arrived.
+
+    Nothing will release them, so they must be published on their own.
+    Maps each follower id to its record (``leader``, ``lane``, ``tenant``).
+    """
+    attached = {
+        follower_id: json.loads(record)
+        async for follower_id, record in redis_client.hscan_iter(ATTACHED_KEY)
+    }
+    leaders = sorted({record["leader"] for record in attached.values()})
+    if not leaders:
+        return {}
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for leader_id in leaders:
+            pipe.exists(f"{INFLIGHT_PREFIX}task:{leader_id}")
+        alive = {leader_id for leader_id, exists in zip(leaders, await pipe.execute()) if exists}
+    return {
+        follower_id: record for follower_id, record in attached.items()
+        if record["leader"] not in alive
+    }
+
+
+async def forget_followers(follower_ids: list[str]):
+    if follower_ids:
+        await redis_client.hdel(ATTACHED_KEY, *follower_ids)
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from sqlalchemy import bindparam, update
+from db import SessionLocal, Task
+from metrics import DB_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ResultWriter:
+    """Write-behind buffer for completed task results.
+
+    Results are collected in memory and written as one executemany UPDATE
+    in a single transaction, either every ``flush_interval_ms`` or as soon
+    as ``max_batch`` results are waiting. A later result for the same task
+    replaces the buffered one.
+
+    ``ack_id`` values passed to ``add`` are handed to ``on_flushed`` only
+    after the transaction that contains them has committed.
+
+    Failed flushes keep their rows for the next attempt. Producers call
+    ``wait_for_room`` before adding, which blocks while ``max_buffered``
+    results are waiting, so a database outage stops the result consumer
+    (its entries stay pending in Redis) instead of growing the buffer.
+    """
+
+    def __init__(self, flush_interval_ms: float, max_batch: int,
+                 on_flushed: Callable[[list[str]], Awaitable] | None = None,
+                 max_buffered: int = 10000):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_buffered = max_buffered
+        self.on_flushed = on_flushed
+        self._buffer: dict[str, dict] = {}
+        self._ack_ids: list[str] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._loop_task: asyncio.Task | None = None
+
+    def add(self, task_id: str, status: str, summary: str | None, ack_id: str | None = None):
+        self._buffer[task_id] = {"task_id": task_id, "status": status, "summary": summary}
+        if ack_id is not None:
+            self._ack_ids.append(ack_id)
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    async def wait_for_room(self):
+        while len(self._buffer) >= self.max_buffered:
+            self._flushed.clear()
+            self._wakeup.set()
+            await self._flushed.wait()
+
+    def start(self):
+        # Bind the synchronization primitives to the loop that runs the writer.
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background loop and write out whatever is still buffered."""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush results: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = list(self._buffer.values()), {}
+            ack_ids, self._ack_ids = self._ack_ids, []
+            try:
+                with DB_WRITE_SECONDS.labels("result_flush").time():
+                    async with SessionLocal() as db:
+                        await db.execute(
+                            update(Task.__table__)
+                            .where(Task.__table__.c.id == bindparam("task_id"))
+                            .values(status=bindparam("status"), summary=bindparam("summary")),
+                            rows,
+                        )
+                        await db.commit()
+            except Exception:
+                # Put the rows back unless a newer result arrived meanwhile.
+                for row in rows:
+                    self._buffer.setdefault(row["task_id"], row)
+                self._ack_ids.extend(ack_ids)
+                raise
+            logger.info(f"Persisted {len(rows)} results")
+            self._flushed.set()
+
+        if ack_ids and self.on_flushed is not None:
+            try:
+                await self.on_flushed(ack_ids)
+            except Exception as e:
+                # Unacknowledged results are redelivered; re-applying them is harmless.
+                logger.warning(f"Failed to acknowledge {len(ack_ids)} results: {e}")
@@ -0,0 +1,271 @@
+"""
+Retention of finished tasks: archive expired rows, delete them, compact the database.
+
+Rows older than the TTL of their status are appended to date-partitioned
+archive files, ``{archive_dir}/date=YYYY-MM-DD/tasks.jsonl.zst`` (by
+``created_at``), one zstd frame per batch, and then deleted in their own
+short transaction. Archived tasks can be put back with ``restore``; a
+restored task expires a full TTL after it was restored:
+
+    python retention.py run
+    python retention.py restore --task-id <id> [--task-id <id> ...]
+    python retention.py restore --batch-id <id> --since 2024-01-01 --until 2024-01-31
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import zstandard
+from sqlalchemy import delete, insert, or_, select, text
+from db import SessionLocal, Task, engine, init_models, is_sqlite
+from metrics import DB_WRITE_SECONDS, TASKS_ARCHIVED
+from redis_client import claim_periodic_job
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE = "tasks.jsonl.zst"
+_COLUMNS = (Task.id, Task.status, Task.text, Task.summary, Task.created_at, Task.batch_id)
+
+
+def partition_path(archive_dir: Path, day: date) -> Path:
+    return archive_dir / f"date={day.isoformat()}" / ARCHIVE_FILE
+
+
+def _row_to_record(row) -> dict:
+    return {
+        "id": row.id,
+        "status": row.status,
+        "text": row.text,
+        "summary": row.summary,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "batch_id": row.batch_id,
+    }
+
+
+def append_records(archive_dir: Path, records: list[dict], level: int):
+    """Append records to their date partitions, one zstd frame per file, and fsync."""
+    by_day: dict[date, list[str]] = {}
+    for record in records:
+        created_at = record["created_at"]
+        day = datetime.fromisoformat(created_at).date() if created_at else date.min
+        by_day.setdefault(day, []).append(json.dumps(record, ensure_ascii=False))
+    compressor = zstandard.ZstdCompressor(level=level)
+    for day, lines in by_day.items():
+        path = partition_path(archive_dir, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(compressor.compress(("\n".join(lines) + "\n").encode("utf-8")))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_records(archive_dir: Path, since: date | None = None, until: date | None = None):
+    """Yield archived records from the partitions between ``since`` and ``until`` (inclusive)."""
+    for partition in sorted(archive_dir.glob(f"date=*/{ARCHIVE_FILE}")):
+        day = date.fromisoformat(partition.parent.name.removeprefix("date="))
+        if (since and day < since) or (until and day > until):
+            continue
+        with open(partition, "rb") as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+
+class RetentionJob:
+    """Periodically archives and deletes tasks whose status TTL has passed.
+
+    ``ttl_days`` maps a status to the age after which its tasks expire;
+    statuses not listed are kept. Rows go out ``batch_size`` at a time
+    with a pause between batches, so writers never wait long on the
+    database. Afterwards SQLite gives up to ``vacuum_pages`` free pages back
+    to the file system (``PRAGMA incremental_vacuum``). With several gateway
+    instances, a Redis claim makes only one of them run each pass.
+    """
+
+    def __init__(self, ttl_days: dict[str, float], archive_dir: str, batch_size: int,
+                 pause_ms: float, interval_seconds: float, vacuum_pages: int,
+                 compression_level: int = 3):
+        self.ttl_days = ttl_days
+        self.archive_dir = Path(archive_dir)
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+        self.interval = interval_seconds
+        self.vacuum_pages = vacuum_pages
+        self.compression_level = compression_level
+        self._loop_task: asyncio.Task | None = None
+
+    def start(self):
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if await claim_periodic_job("retention", self.interval):
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"Retention pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> dict[str, int]:
+        """Archive and delete every expired task now; returns counts per status."""
+        archived = {}
+        for status, days in self.ttl_days.items():
+            cutoff = datetime.utcnow() - timedelta(days=days)
+            archived[status] = 0
+            while True:
+                count = await self._archive_batch(status, cutoff)
+                archived[status] += count
+                if count < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+        if any(archived.values()):
+            logger.info(f"Archived expired tasks: {archived}")
+            await self.vacuum()
+        return archived
+
+    async def _archive_batch(self, status: str, cutoff: datetime) -> int:
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(*_COLUMNS)
+                .where(
+                    Task.status == status,
+                    Task.created_at < cutoff,
+                    or_(Task.restored_at.is_(None), Task.restored_at < cutoff),
+                )
+                .order_by(Task.created_at, Task.id)
+                .limit(self.batch_size)
+            )).all()
+        if not rows:
+            return 0
+
+        # The archive is durable before anything is deleted; a crash in between
+        # only archives the batch twice, and restore skips tasks that exist.
+        records = [_row_to_record(row) for row in rows]
+        await asyncio.to_thread(append_records, self.archive_dir, records, self.compression_level)
+        with DB_WRITE_SECONDS.labels("retention_delete").time():
+            async with SessionLocal() as db:
+                await db.execute(delete(Task).where(
+                    Task.id.in_([row.id for row in rows]), Task.status == status
+                ))
+                await db.commit()
+        TASKS_ARCHIVED.labels(status).inc(len(rows))
+        return len(rows)
+
+    async def vacuum(self):
+        if not is_sqlite:
+            return  # PostgreSQL reclaims space with autovacuum
+        async with engine.connect() as conn:
+            mode = (await conn.execute(text("PRAGMA auto_vacuum"))).scalar()
+            if mode != 2:
+                logger.warning(
+                    "SQLite auto_vacuum is not INCREMENTAL; the gateway enables it with a"
+                    " one-off VACUUM when it starts with retention enabled"
+                )
+                return
+            # Each step of the pragma frees one page and the sqlite3 module steps
+            # a statement without result columns only once; a script runs it out.
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript(
+                f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})"
+            )
+
+
+async def restore(archive_dir: str, task_ids: set[str] | None = None, batch_id: str | None = None,
+                  since: date | None = None, until: date | None = None) -> int:
+    """Insert the matching archived tasks that are not in the database; returns how many.
+
+    Restored tasks get ``restored_at``, so retention keeps them for another full TTL.
+    """
+    restored = 0
+    pending: dict[str, dict] = {}
+
+    async def flush():
+        nonlocal restored
+        restored_at = datetime.utcnow()
+        async with SessionLocal() as db:
+            existing = set((await db.scalars(
+                select(Task.id).where(Task.id.in_(list(pending)))
+            )).all())
+            rows = [
+                {**record, "created_at": datetime.fromisoformat(record["created_at"])
+                 if record["created_at"] else None, "restored_at": restored_at}
+                for task_id, record in pending.items() if task_id not in existing
+            ]
+            if rows:
+                await db.execute(insert(Task), rows)
+                await db.commit()
+        restored += len(rows)
+        pending.clear()
+
+    for record in read_records(Path(archive_dir), since, until):
+        if task_ids is not None and record["id"] not in task_ids:
+            continue
+        if batch_id is not None and record["batch_id"] != batch_id:
+            continue
+        pending[record["id"]] = record
+        if len(pending) >= settings.retention_batch_size:
+            await flush()
+    if pending:
+        await flush()
+    return restored
+
+
+def make_job() -> RetentionJob:
+    return RetentionJob(
+        ttl_days=settings.retention_ttl_days,
+        archive_dir=settings.retention_archive_dir,
+        batch_size=settings.retention_batch_size,
+        pause_ms=settings.retention_pause_ms,
+        interval_seconds=settings.retention_interval_seconds,
+        vacuum_pages=settings.retention_vacuum_pages,
+        compression_level=settings.retention_compression_level,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="archive and delete expired tasks once")
+    restore_parser = commands.add_parser("restore", help="put archived tasks back")
+    restore_parser.add_argument("--task-id", action="append", dest="task_ids")
+    restore_parser.add_argument("--batch-id")
+    restore_parser.add_argument("--since", type=date.fromisoformat, help="first partition date")
+    restore_parser.add_argument("--until", type=date.fromisoformat, help="last partition date")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    async def execute():
+        await init_models()
+        if args.command == "run":
+            print(json.dumps(await make_job().run_once()))
+        else:
+            count = await restore(
+                settings.retention_archive_dir,
+                task_ids=set(args.task_ids) if args.task_ids else None,
+                batch_id=args.batch_id,
+                since=args.since,
+                until=args.until,
+            )
+            print(f"Restored {count} tasks")
+        await engine.dispose()
+
+    asyncio.run(execute())
+
+
+if __name__ == "__main__":
+    main()
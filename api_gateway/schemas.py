@@ -1,10 +1,32 @@
+from datetime import datetime
+from typing import Literal
 from pydantic import BaseModel
 
 class SummarizeRequest(BaseModel):
     text: str
+    priority: Literal["interactive", "batch"] = "interactive"
+    client_id: str | None = None
+    # Accept an extractive summary instead of queueing when the backlog is long
+    allow_degraded: bool = False
 
 class TaskResponse(BaseModel):
     task_id: str
     status: str
     summary: str | None = None
-    text: str | None = None
\ No newline at end of file
+    text: str | None = None
+    created_at: datetime | None = None
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: dict[str, int]
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    count: int
+    status: str
+
+class BatchStats(BaseModel):
+    batch_id: str
+    total: int
+    by_status: dict[str, int]
+    done: bool
@@ -4,6 +4,74 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379"
     database_url: str = "sqlite:///./tasks.db"
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    sqlite_busy_timeout_ms: int = 5000
+    task_stream_maxlen: int = 100000
+    # Commands sent per Redis round trip when enqueueing a batch
+    publish_pipeline_size: int = 1000
+
+    # Bulk submission (POST /summarize/batch)
+    batch_max_items: int = 100000
+    batch_insert_chunk: int = 5000
+    batch_results_page: int = 1000
+
+    # Texts of at least this many bytes are stored once in Redis and
+    # referenced from the task message by their hash (claim check)
+    claim_check_min_bytes: int = 4096
+    blob_ttl_seconds: int = 86400
+    blob_compression_level: int = 3
+
+    # Result stream consumption (one gateway instance persists each result)
+    gateway_name: str | None = None
+    result_read_count: int = 100
+    result_block_ms: int = 5000
+    result_reclaim_idle_ms: int = 60000
+    result_reclaim_interval_seconds: float = 30.0
+    # Backoff before restarting a failed result consumer or event subscriber
+    consumer_retry_initial_seconds: float = 0.5
+    consumer_retry_max_seconds: float = 30.0
+    event_text_preview: int = 300
+
+    # Admission control: a new task's estimated wait (tasks ahead divided by
+    # recent worker throughput) decides whether it is admitted, degraded to
+    # the extractive fast path (if the client allows it) or rejected with 429
+    admission_enabled: bool = True
+    admission_refresh_seconds: float = 1.0
+    admission_min_throughput: float = 1.0
+    admission_degrade_wait_seconds: dict[str, float] = {"interactive": 30.0, "batch": 600.0}
+    admission_reject_wait_seconds: dict[str, float] = {"interactive": 120.0, "batch": 3600.0}
+    admission_max_retry_after: int = 300
+
+    result_flush_interval_ms: float = 200.0
+    result_flush_max_batch: int = 500
+    # Results held in memory at most, e.g. while the database is down
+    result_buffer_max: int = 10000
+    # GET /tasks/{id}?wait= and SSE streams
+    task_wait_max_seconds: float = 60.0
+    task_result_cache_size: int = 10000
+    sse_queue_size: int = 1000
+    sse_keepalive_seconds: float = 15.0
+
+    # Retention: tasks older than the TTL (days) of their status are archived
+    # to date-partitioned .jsonl.zst files and deleted; unlisted statuses are kept
+    retention_enabled: bool = False
+    retention_ttl_days: dict[str, float] = {"done": 30.0}
+    retention_archive_dir: str = "./archive"
+    retention_batch_size: int = 1000
+    retention_pause_ms: float = 50.0
+    retention_interval_seconds: float = 3600.0
+    retention_vacuum_pages: int = 2000
+    retention_compression_level: int = 10
+
+    ws_queue_size: int = 256
+    ws_send_timeout: float = 10.0
+    coalesce_enabled: bool = True
+    # In-flight entries live for the lane's admission reject wait plus this
+    coalesce_ttl_seconds: int = 600
+    coalesce_sweep_interval_seconds: float = 60.0
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,93 @@
+import asyncio
+from collections import OrderedDict
+
+# Events that end a task; long-poll futures resolve on them.
+FINAL_EVENTS = ("updated", "deleted")
+
+
+class ResultWaiters:
+    """Parks HTTP clients until the event they wait for reaches this gateway.
+
+    Every gateway instance receives every task event, so a client may wait
+    on any instance, whichever one persisted the result. Long polls wait on
+    a future per task; SSE streams get a bounded queue per task or batch id.
+    A stream whose queue overflows receives ``None`` and should end, so the
+    client reconnects and starts from the current state. The last
+    ``recent_size`` final results are kept so repeated polls of a finished
+    task do not reach the database.
+    """
+
+    def __init__(self, recent_size: int, queue_size: int):
+        self.recent_size = recent_size
+        self.queue_size = queue_size
+        self._recent: OrderedDict[str, dict] = OrderedDict()
+        self._futures: dict[str, set[asyncio.Future]] = {}
+        self._streams: dict[str, set[asyncio.Queue]] = {}
+
+    def count(self) -> int:
+        return sum(map(len, self._futures.values())) + sum(map(len, self._streams.values()))
+
+    def recent(self, task_id: str) -> dict | None:
+        """The final state of ``task_id`` if this gateway saw it recently."""
+        state = self._recent.get(task_id)
+        if state is not None:
+            self._recent.move_to_end(task_id)
+        return state
+
+    def future(self, task_id: str) -> asyncio.Future:
+        """A future resolved with the next final event of ``task_id``.
+
+        Create it before reading the current state, then ``discard_future``.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._futures.setdefault(task_id, set()).add(future)
+        return future
+
+    def discard_future(self, task_id: str, future: asyncio.Future):
+        futures = self._futures.get(task_id)
+        if futures is not None:
+            futures.discard(future)
+            if not futures:
+                del self._futures[task_id]
+
+    def subscribe(self, key: str) -> asyncio.Queue:
+        """A queue of the events for task or batch ``key``."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._streams.setdefault(key, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, key: str, queue: asyncio.Queue):
+        queues = self._streams.get(key)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._streams[key]
+
+    def publish(self, message: dict):
+        event, task_id = message.get("event"), message.get("task_id")
+        if task_id is None:
+            return
+        if event == "updated":
+            self._recent[task_id] = {"status": message["status"], "summary": message["summary"]}
+            self._recent.move_to_end(task_id)
+            while len(self._recent) > self.recent_size:
+                self._recent.popitem(last=False)
+        elif event == "deleted":
+            self._recent.pop(task_id, None)
+
+        if event in FINAL_EVENTS:
+            for future in self._futures.pop(task_id, ()):
+                if not future.done():
+                    future.set_result(message)
+        for key in (task_id, message.get("batch_id")):
+            for queue in self._streams.get(key, ()):
+                self._put(queue, message)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, message: dict):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
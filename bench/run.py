@@ -0,0 +1,350 @@
+"""
+End-to-end load test: gateway and workers as subprocesses, fake model backend.
+
+Starts a Redis stand-in (``redis-server`` if it is on PATH, otherwise an
+in-process fakeredis TCP server; ``--redis-url`` uses an existing one), the API gateway under uvicorn and
+``--workers`` worker processes with ``MODEL_BACKEND=fake``. Tasks are then
+submitted with Poisson arrivals at ``--rate`` per second while WebSocket
+clients listen for results. The report (JSON) contains submit-to-result
+latency percentiles, throughput and the task stream backlog, sampled from
+the gateway's ``gateway_queue_depth`` metric (pending entries, plus entries
+not yet delivered on Redis 7+).
+
+    python bench/run.py --rate 20 --duration 30 --output bench/results/latest.json
+    python bench/run.py --baseline bench/baseline.json --tolerance 0.25
+
+With ``--baseline`` the run fails (exit code 1) if p95/p99 latency or
+throughput regressed by more than ``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import websockets
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORDS = (
+    "the summarizer reads each document splits it into chunks and returns a short "
+    "overview of the main points so that readers can decide quickly what to open"
+).split()
+
+
+QUEUE_DEPTH_SAMPLE = re.compile(r"^gateway_queue_depth\{[^}]*\}\s+(\S+)", re.MULTILINE)
+
+
+def queue_depth(metrics_text: str) -> int:
+    """Total task stream backlog over all lanes and states in a /metrics response."""
+    return int(sum(float(value) for value in QUEUE_DEPTH_SAMPLE.findall(metrics_text)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def make_text(rng: random.Random, min_words: int, max_words: int) -> str:
+    # A random prefix keeps texts unique, so caching and coalescing stay out of the numbers.
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return f"Document {rng.getrandbits(64):x}. " + " ".join(words) + "."
+
+
+def start_redis(port: int):
+    """Return a callable that stops the Redis stand-in listening on ``port``."""
+    binary = shutil.which("redis-server")
+    if binary:
+        process = subprocess.Popen(
+            [binary, "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL,
+        )
+        return process.terminate
+
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def wait_for_port(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing is listening on port {port} after {timeout}s")
+
+
+class Run:
+    def __init__(self, args):
+        self.args = args
+        self.submitted: dict[str, float] = {}
+        self.completed: dict[str, float] = {}
+        self.failed: set[str] = set()
+        self.submit_latencies: list[float] = []
+        self.http_errors = 0
+        self.depth_samples: list[int] = []
+        self.first_submit: float | None = None
+
+    @property
+    def outstanding(self) -> int:
+        return len(self.submitted.keys() - self.completed.keys())
+
+    async def listen(self, url: str, record: bool):
+        async with websockets.connect(url, max_size=None) as ws:
+            async for raw in ws:
+                event = json.loads(raw)
+                if record and event.get("event") == "updated":
+                    self.completed.setdefault(event["task_id"], time.monotonic())
+                    if str(event.get("summary", "")).startswith("Error"):
+                        self.failed.add(event["task_id"])
+
+    async def submit(self, client: httpx.AsyncClient, text: str, priority: str):
+        started = time.monotonic()
+        if self.first_submit is None:
+            self.first_submit = started
+        try:
+            response = await client.post("/summarize", json={"text": text, "priority": priority})
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.http_errors += 1
+            return
+        self.submit_latencies.append(time.monotonic() - started)
+        self.submitted[response.json()["task_id"]] = started
+
+    async def sample_depth(self, base_url: str):
+        async with httpx.AsyncClient(base_url=base_url, timeout=5.0) as client:
+            while True:
+                try:
+                    response = await client.get("/metrics")
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    pass
+                else:
+                    self.depth_samples.append(queue_depth(response.text))
+                await asyncio.sleep(0.5)
+
+    async def drive(self, base_url: str, ws_url: str):
+        args = self.args
+        rng = random.Random(args.seed)
+        listeners = [
+            asyncio.create_task(self.listen(ws_url, record=(i == 0)))
+            for i in range(args.ws_clients)
+        ]
+        await asyncio.sleep(0.5)  # let the WebSocket clients subscribe
+        sampler = asyncio.create_task(self.sample_depth(base_url))
+        pending = set()
+        async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+            deadline = time.monotonic() + args.duration
+            while time.monotonic() < deadline:
+                priority = "batch" if rng.random() < args.batch_share else "interactive"
+                text = make_text(rng, args.min_words, args.max_words)
+                task = asyncio.create_task(self.submit(client, text, priority))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                await asyncio.sleep(rng.expovariate(args.rate))
+            if pending:
+                await asyncio.wait(pending)
+
+        drain_deadline = time.monotonic() + args.drain_timeout
+        while self.outstanding and time.monotonic() < drain_deadline:
+            await asyncio.sleep(0.1)
+        for task in (sampler, *listeners):
+            task.cancel()
+        await asyncio.gather(sampler, *listeners, return_exceptions=True)
+
+    def report(self) -> dict:
+        latencies = [
+            self.completed[task_id] - started
+            for task_id, started in self.submitted.items()
+            if task_id in self.completed
+        ]
+        elapsed = None
+        if latencies:
+            elapsed = max(self.completed[t] for t in self.submitted if t in self.completed) - self.first_submit
+
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "config": {
+                key: getattr(self.args, key)
+                for key in (
+                    "rate", "duration", "workers", "worker_concurrency", "ws_clients",
+                    "batch_share", "min_words", "max_words", "latency_ms", "tokens_per_second",
+                    "seed",
+                )
+            },
+            "submitted": len(self.submitted),
+            "completed": len(latencies),
+            "failed": len(self.failed),
+            "lost": self.outstanding,
+            "http_errors": self.http_errors,
+            "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": ms(percentile(latencies, 0.50)),
+                "p95": ms(percentile(latencies, 0.95)),
+                "p99": ms(percentile(latencies, 0.99)),
+                "max": ms(max(latencies, default=None)),
+            },
+            "submit_latency_ms": {
+                "p50": ms(percentile(self.submit_latencies, 0.50)),
+                "p99": ms(percentile(self.submit_latencies, 0.99)),
+            },
+            "queue_depth": {
+                "max": max(self.depth_samples, default=0),
+                "mean": round(sum(self.depth_samples) / len(self.depth_samples), 1)
+                if self.depth_samples else 0,
+            },
+        }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return the regressions of ``report`` against ``baseline``."""
+    problems = []
+    for key in ("p95", "p99"):
+        current, previous = report["latency_ms"][key], baseline["latency_ms"][key]
+        if current is None or (previous and current > previous * (1 + tolerance)):
+            problems.append(f"{key} latency {current} ms vs baseline {previous} ms")
+    current, previous = report["throughput_per_s"], baseline["throughput_per_s"]
+    if current < previous * (1 - tolerance):
+        problems.append(f"throughput {current}/s vs baseline {previous}/s")
+    if report["lost"] or report["failed"] or report["http_errors"]:
+        problems.append(
+            f"{report['lost']} lost, {report['failed']} failed, {report['http_errors']} HTTP errors"
+        )
+    return problems
+
+
+def start_services(args, workdir: Path):
+    api_port = free_port()
+    redis_url, stop_redis = args.redis_url, lambda: None
+    if redis_url is None:
+        redis_port = free_port()
+        stop_redis = start_redis(redis_port)
+        wait_for_port(redis_port, 10)
+        redis_url = f"redis://127.0.0.1:{redis_port}"
+
+    env = {
+        **os.environ,
+        "REDIS_URL": redis_url,
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+        "MODEL_BACKEND": "fake",
+        "WORKER_CONCURRENCY": str(args.worker_concurrency),
+        "FAKE_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LATENCY_SIGMA": str(args.latency_sigma),
+        "FAKE_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "FAKE_ERROR_RATE": "0",
+        "SUMMARY_CACHE_ENABLED": "false",
+        "NEAR_DUPLICATE_ENABLED": "false",
+    }
+    log = open(workdir / "services.log", "w")
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port),
+             "--log-level", "warning"],
+            cwd=ROOT / "api_gateway", env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    ]
+    for i in range(args.workers):
+        processes.append(subprocess.Popen(
+            [sys.executable, "main.py"],
+            cwd=ROOT / "worker",
+            env={**env, "WORKER_NAME": f"bench-{i}", "METRICS_PORT": str(free_port())},
+            stdout=log, stderr=subprocess.STDOUT,
+        ))
+    wait_for_port(api_port, 30)
+
+    def stop():
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        stop_redis()
+        log.close()
+
+    return api_port, stop
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--redis-url", help="use this Redis instead of starting one (it should be empty)")
+    parser.add_argument("--rate", type=float, default=20.0, help="task arrivals per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--worker-concurrency", type=int, default=10)
+    parser.add_argument("--ws-clients", type=int, default=5)
+    parser.add_argument("--batch-share", type=float, default=0.0,
+                        help="fraction of tasks submitted with priority=batch")
+    parser.add_argument("--min-words", type=int, default=50)
+    parser.add_argument("--max-words", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=200.0,
+                        help="median time to first token of the fake backend")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        workdir = Path(tmp)
+        api_port, stop = start_services(args, workdir)
+        run = Run(args)
+        try:
+            asyncio.run(run.drive(f"http://127.0.0.1:{api_port}", f"ws://127.0.0.1:{api_port}/ws"))
+        finally:
+            stop()
+        if run.outstanding or run.http_errors:
+            sys.stderr.write((workdir / "services.log").read_text()[-4000:])
+
+    report = run.report()
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.baseline:
+        problems = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
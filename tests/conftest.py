@@ -3,8 +3,24 @@ Test configuration and shared fixtures.
 """
 import pytest
 import asyncio
+import os
+import shutil
+import tempfile
 from typing import Generator
 
+# The gateway creates its engine on import, so the test database is chosen
+# before any test module imports it: a fresh SQLite file per session, never
+# the tasks.db next to the code.
+_database_dir = tempfile.mkdtemp(prefix="summarizer-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/tasks.db"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def test_database_dir():
+    """Directory of the session's test database, removed after the session."""
+    yield _database_dir
+    shutil.rmtree(_database_dir, ignore_errors=True)
+
 
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
@@ -3,9 +3,11 @@ Tests for API Gateway endpoints.
 """
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy import select
 import sys
 import os
+import uuid
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api_gateway'))
@@ -15,8 +17,15 @@ from main import app
 
 @pytest.fixture
 def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+    """Create a test client for the FastAPI app (runs startup, which creates tables).
+
+    The Redis stream and event consumers started on startup are replaced with
+    no-ops; tests drive ``handle_result`` and ``on_event`` directly.
+    """
+    with patch('main.consume_results', new_callable=AsyncMock), \
+         patch('main.subscribe_events', new_callable=AsyncMock), \
+         TestClient(app) as test_client:
+        yield test_client
 
 
 def test_read_root(client):
@@ -130,3 +139,596 @@ def test_cors_headers(client):
     response = client.get("/tasks")
     assert response.status_code == 200
     # Could check for CORS headers if needed
+
+
+def test_identical_submission_attaches_to_inflight_task(client, sample_text):
+    """Test that a text already in flight is not published a second time."""
+    with patch('main.publish_task') as mock_publish, \
+         patch('main.claim_inflight', new_callable=AsyncMock) as mock_claim:
+        mock_claim.return_value = "leader-task-id"
+
+        response = client.post("/summarize", json={"text": sample_text})
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "queued"
+        mock_publish.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_result_fans_out_to_attached_tasks():
+    """Test that a result reaches every attached task and they are released after the commit."""
+    from main import handle_result, result_writer
+    from db import SessionLocal, Task, init_models
+
+    await init_models()
+    async with SessionLocal() as db:
+        db.add_all([Task(id="leader-1", text="same"), Task(id="follower-1", text="same")])
+        await db.commit()
+
+    with patch('main.close_inflight', new_callable=AsyncMock) as mock_close, \
+         patch('main.release_inflight', new_callable=AsyncMock) as mock_release, \
+         patch('main.ack_results', new_callable=AsyncMock) as mock_ack, \
+         patch('main.notify_all', new_callable=AsyncMock) as mock_notify:
+        mock_close.return_value = ["follower-1"]
+
+        await handle_result({"task_id": "leader-1", "summary": "Shared summary"}, "5-0")
+
+        assert mock_notify.call_count == 2
+        # A crash before the commit must leave the followers attached for the redelivery.
+        mock_release.assert_not_called()
+        await result_writer.flush()
+        mock_release.assert_called_once_with(["leader-1"])
+        mock_ack.assert_called_once_with(["5-0"])
+
+    async with SessionLocal() as db:
+        result = await db.execute(select(Task).where(Task.id.in_(["leader-1", "follower-1"])))
+        tasks = result.scalars().all()
+    assert {t.status for t in tasks} == {"done"}
+    assert {t.summary for t in tasks} == {"Shared summary"}
+
+
+@pytest.mark.asyncio
+async def test_inflight_entries_are_per_lane_and_orphans_are_republished():
+    """Test that tasks coalesce within a lane and followers of an expired leader are republished."""
+    fakeredis = pytest.importorskip("fakeredis")
+    import main
+    import redis_client
+    from db import SessionLocal, Task, init_models
+
+    await init_models()
+    async with SessionLocal() as db:
+        db.add(Task(id="orphan-follower", text="same text"))
+        await db.commit()
+
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch('redis_client.redis.from_url', return_value=fake):
+        redis_client.connect()
+    try:
+        assert await redis_client.claim_inflight("h", "batch-leader", "batch", "acme") is None
+        assert await redis_client.claim_inflight("h", "quick-leader", "interactive") is None
+        claim = redis_client.claim_inflight
+        assert await claim("h", "quick-follower", "interactive") == "quick-leader"
+        assert await claim("h", "orphan-follower", "batch", "acme") == "batch-leader"
+        assert await redis_client.close_inflight("quick-leader") == ["quick-follower"]
+        # Closed: an identical task leads a job of its own, the followers stay until release.
+        assert await claim("h", "quick-again", "interactive") is None
+        assert await redis_client.close_inflight("quick-leader") == ["quick-follower"]
+        await redis_client.release_inflight(["quick-leader"])
+        assert await redis_client.close_inflight("quick-leader") == []
+        assert await fake.ttl("inflight:task:batch-leader") > 3600
+        assert await main.republish_orphaned_followers() == 0
+
+        # The batch leader waited longer than its in-flight entry lives.
+        await fake.delete("inflight:task:batch-leader")
+        with patch('main.publish_task', new_callable=AsyncMock) as mock_publish:
+            assert await main.republish_orphaned_followers() == 1
+        assert mock_publish.call_args.args[0]["task_id"] == "orphan-follower"
+        assert mock_publish.call_args.args[0]["text"] == "same text"
+        assert mock_publish.call_args.kwargs == {"lane": "batch", "tenant": "acme"}
+        assert await redis_client.orphaned_followers() == {}
+    finally:
+        await redis_client.close()
+
+
+@pytest.mark.asyncio
+async def test_handle_result_defers_ack_and_publishes_compact_event():
+    """Test that the stream entry is handed to the writer and the event omits the text."""
+    from main import handle_result
+
+    with patch('main.result_writer.add') as mock_add, \
+         patch('main.close_inflight', new_callable=AsyncMock, return_value=[]), \
+         patch('main.publish_event', new_callable=AsyncMock) as mock_publish:
+        await handle_result({"task_id": "t1", "summary": "Done"}, "1700000000000-0")
+
+        mock_add.assert_called_once_with("t1", "done", "Done", ack_id="1700000000000-0")
+        mock_publish.assert_called_once_with(
+            {"event": "updated", "task_id": "t1", "status": "done", "summary": "Done"}
+        )
+
+        await handle_result(
+            {"task_id": "t2", "status": "failed", "summary": "Error: gave up"}, "1700000000000-1"
+        )
+        mock_add.assert_called_with("t2", "failed", "Error: gave up", ack_id="1700000000000-1")
+        assert mock_publish.call_args.args[0]["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_supervise_restarts_failed_consumers():
+    """Test that a consumer that fails is restarted after a backoff."""
+    import asyncio
+    import main
+
+    consumer = AsyncMock(side_effect=[ConnectionError("Connection lost"), asyncio.CancelledError()])
+    with patch('main.settings.consumer_retry_initial_seconds', 0.01), \
+         pytest.raises(asyncio.CancelledError):
+        await main.supervise("Test consumer", consumer, "callback")
+
+    assert consumer.await_count == 2
+    consumer.assert_awaited_with("callback")
+
+
+@pytest.mark.asyncio
+async def test_result_writer_acks_only_after_commit():
+    """Test that stream entries are acknowledged once their batch is committed."""
+    from db import init_models
+    from result_writer import ResultWriter
+
+    await init_models()
+    on_flushed = AsyncMock()
+    writer = ResultWriter(flush_interval_ms=10_000, max_batch=100, on_flushed=on_flushed)
+    writer.add("ack-task", "done", "summary", ack_id="1-0")
+    writer.add("ack-follower", "done", "summary")
+
+    on_flushed.assert_not_called()
+    await writer.flush()
+    on_flushed.assert_called_once_with(["1-0"])
+
+
+def test_list_tasks_keyset_pagination(client):
+    """Test that pages follow X-Next-Cursor without repeating tasks."""
+    with patch('main.publish_task'), patch('main.settings.coalesce_enabled', False):
+        for i in range(3):
+            client.post("/summarize", json={"text": f"Pagination text {i}"})
+
+    first = client.get("/tasks", params={"limit": 2})
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/tasks", params={"limit": 2, "cursor": cursor})
+    assert second.status_code == 200
+    first_ids = {t["task_id"] for t in first.json()}
+    assert not first_ids & {t["task_id"] for t in second.json()}
+
+    assert client.get("/tasks", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_create_task_sends_large_text_by_reference(client, long_text):
+    """Test that large texts are stored once and the task message carries only a reference."""
+    import hashlib
+
+    with patch('main.publish_task', new_callable=AsyncMock) as mock_publish, \
+         patch('main.store_text', new_callable=AsyncMock) as mock_store, \
+         patch('main.settings.coalesce_enabled', False), \
+         patch('main.settings.claim_check_min_bytes', 100):
+        client.post("/summarize", json={"text": long_text})
+        client.post("/summarize", json={"text": "short"})
+
+    text_hash = hashlib.sha256(long_text.encode("utf-8")).hexdigest()
+    mock_store.assert_called_once_with(text_hash, long_text)
+    large, small = [call.args[0] for call in mock_publish.call_args_list]
+    assert large["text_ref"] == text_hash and "text" not in large
+    assert small["text"] == "short" and "text_ref" not in small
+
+
+def test_create_task_routes_by_priority_and_client(client):
+    """Test that the priority picks the lane and the client id becomes the tenant."""
+    with patch('main.publish_task', new_callable=AsyncMock) as mock_publish, \
+         patch('main.settings.coalesce_enabled', False):
+        client.post("/summarize", json={"text": "bulk job", "priority": "batch", "client_id": "acme"})
+        client.post("/summarize", json={"text": "quick job"})
+        rejected = client.post("/summarize", json={"text": "x", "priority": "urgent"})
+
+    assert rejected.status_code == 422
+    bulk, quick = mock_publish.call_args_list
+    assert bulk.kwargs == {"lane": "batch", "tenant": "acme"}
+    assert quick.kwargs == {"lane": "interactive", "tenant": "testclient"}
+
+
+def test_metrics_and_trace_id(client):
+    """Test that tasks carry a trace id and the gateway exposes Prometheus metrics."""
+    with patch('main.publish_task', new_callable=AsyncMock) as mock_publish, \
+         patch('main.settings.coalesce_enabled', False), \
+         patch('main.task_queue_stats', new_callable=AsyncMock,
+               return_value={"interactive": {"pending": 3, "waiting": 7}}):
+        response = client.post(
+            "/summarize", json={"text": "trace me"}, headers={"X-Trace-Id": "abc123"}
+        )
+        metrics = client.get("/metrics")
+
+    assert response.headers["X-Trace-Id"] == "abc123"
+    message = mock_publish.call_args.args[0]
+    assert message["trace_id"] == "abc123" and "enqueued_at" in message
+    assert metrics.status_code == 200
+    assert 'gateway_tasks_created_total{lane="interactive"}' in metrics.text
+    assert 'gateway_queue_depth{lane="interactive",state="waiting"} 7.0' in metrics.text
+    assert "gateway_db_write_seconds_bucket" in metrics.text
+
+
+def test_admission_rejects_or_degrades_when_backlog_is_long(client):
+    """Test that a long estimated wait gives 429 with Retry-After unless degrading is allowed."""
+    import main
+    from admission import AdmissionController
+
+    controller = AdmissionController(
+        degrade_wait={"interactive": 30.0, "batch": 600.0},
+        reject_wait={"interactive": 120.0, "batch": 3600.0},
+        min_throughput=1.0,
+        refresh_seconds=60.0,
+        max_retry_after=300,
+    )
+    with patch.object(main, 'admission', controller), \
+         patch('admission.task_queue_stats', new_callable=AsyncMock,
+               return_value={"interactive": {"pending": 10, "waiting": 500}}), \
+         patch('admission.count_completed', new_callable=AsyncMock, return_value=0), \
+         patch('main.publish_task', new_callable=AsyncMock) as mock_publish, \
+         patch('main.publish_fast_task', new_callable=AsyncMock) as mock_fast, \
+         patch('main.settings.coalesce_enabled', False), \
+         patch('main.settings.admission_enabled', True):
+        rejected = client.post("/summarize", json={"text": "wait for me"})
+        degraded = client.post("/summarize", json={"text": "anything", "allow_degraded": True})
+        batch = client.post("/summarize", json={"text": "later", "priority": "batch"})
+
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "300"
+    assert degraded.status_code == 200 and degraded.headers["X-Degraded"] == "true"
+    assert mock_fast.call_args.args[0]["text"] == "anything"
+    assert batch.status_code == 200 and "X-Degraded" not in batch.headers
+    mock_publish.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_admission_estimates_wait_from_shared_throughput():
+    """Test that the wait estimate divides the tasks ahead by the measured completion rate."""
+    from admission import ADMIT, DEGRADE, AdmissionController
+
+    controller = AdmissionController(
+        degrade_wait={"interactive": 5.0, "batch": 5.0},
+        reject_wait={"interactive": 60.0, "batch": 60.0},
+        min_throughput=1.0,
+        refresh_seconds=1.0,
+        max_retry_after=300,
+    )
+    controller.record_completion()
+    with patch('admission.task_queue_stats', new_callable=AsyncMock,
+               return_value={"interactive": {"pending": 60, "waiting": 40}, "batch": {"pending": 400}}), \
+         patch('admission.count_completed', new_callable=AsyncMock,
+               side_effect=[1000, 1500]) as mock_count, \
+         patch('admission.time.monotonic', side_effect=[100.0, 110.0]):
+        await controller.refresh()
+        await controller.refresh()
+
+    assert mock_count.call_args_list[0].args == (1,)
+    assert controller.throughput == 50.0
+    assert controller.estimated_wait("interactive") == 2.0
+    assert controller.estimated_wait("batch") == 10.0
+    with patch.object(controller, 'refresh', new_callable=AsyncMock):
+        assert (await controller.decide("interactive"))[0] == ADMIT
+        assert (await controller.decide("batch"))[0] == DEGRADE
+
+
+@pytest.mark.asyncio
+async def test_admission_keeps_busy_throughput_across_idle_periods():
+    """Test that an idle spell does not shrink the rate a burst is judged by."""
+    from admission import ADMIT, AdmissionController
+
+    controller = AdmissionController(
+        degrade_wait={"interactive": 5.0, "batch": 5.0},
+        reject_wait={"interactive": 60.0, "batch": 60.0},
+        min_throughput=1.0,
+        refresh_seconds=1.0,
+        max_retry_after=300,
+    )
+    busy = {"interactive": {"pending": 20, "waiting": 30}}
+    idle = {"interactive": {"pending": 0, "waiting": 0}}
+    burst = {"interactive": {"pending": 20, "waiting": 100}}
+    with patch('admission.task_queue_stats', new_callable=AsyncMock,
+               side_effect=[busy, busy] + [idle] * 30 + [burst]), \
+         patch('admission.count_completed', new_callable=AsyncMock,
+               side_effect=[0, 500] + [500] * 30 + [500]), \
+         patch('admission.time.monotonic', side_effect=[float(t) for t in range(0, 330, 10)]):
+        for _ in range(33):
+            await controller.refresh()
+
+    assert controller.throughput == 50.0
+    with patch.object(controller, 'refresh', new_callable=AsyncMock):
+        assert await controller.decide("interactive") == (ADMIT, 2.4)
+
+
+def test_batch_submission_progress_and_results(client):
+    """Test bulk submission from NDJSON and JSON, batch progress and NDJSON results."""
+    import asyncio
+    import json
+    import main
+
+    lines = [json.dumps({"text": f"Document number {i}."}) for i in range(5)]
+    with patch('main.publish_tasks', new_callable=AsyncMock) as mock_publish, \
+         patch('main.store_texts', new_callable=AsyncMock) as mock_store:
+        response = client.post(
+            "/summarize/batch",
+            params={"client_id": "acme"},
+            content="\n".join(lines) + "\n",
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        array = client.post("/summarize/batch", json=["one", {"text": "two"}])
+        invalid = client.post("/summarize/batch", json=[{"summary": "no text"}])
+
+    assert response.status_code == 200
+    batch_id = response.json()["batch_id"]
+    assert response.json()["count"] == 5
+    assert array.json()["count"] == 2
+    assert invalid.status_code == 400
+    messages = mock_publish.call_args_list[0].args[0]
+    assert [m["text"] for m in messages] == [f"Document number {i}." for i in range(5)]
+    assert mock_publish.call_args_list[0].kwargs == {"lane": "batch", "tenant": "acme"}
+    mock_store.assert_any_call({})
+
+    main.result_writer.add(messages[0]["task_id"], "done", "Summary zero")
+    asyncio.run(main.result_writer.flush())
+
+    progress = client.get(f"/batches/{batch_id}").json()
+    assert progress["total"] == 5 and progress["by_status"] == {"done": 1, "queued": 4}
+    assert not progress["done"]
+
+    results = client.get(f"/batches/{batch_id}/results")
+    assert results.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in results.text.splitlines()]
+    assert [row["task_id"] for row in rows] == [m["task_id"] for m in messages]
+    assert rows[0]["summary"] == "Summary zero"
+    done = client.get(f"/batches/{batch_id}/results", params={"status": "done"})
+    assert len(done.text.splitlines()) == 1
+    assert client.get("/batches/missing").status_code == 404
+    assert client.get("/batches/missing/results").status_code == 404
+
+    for message in messages[1:]:
+        main.result_writer.add(message["task_id"], "done", "Summary")
+    asyncio.run(main.result_writer.flush())
+    events = client.get(f"/batches/{batch_id}/events")
+    assert events.text.count("event: progress") == 1 and '"done": true' in events.text
+
+
+def test_get_task_etag_long_poll_and_sse(client):
+    """Test conditional GETs, a long poll resolved by the result event, and task SSE."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    import main
+
+    with patch('main.publish_task', new_callable=AsyncMock), \
+         patch('main.settings.coalesce_enabled', False):
+        task_id = client.post("/summarize", json={"text": "poll me"}).json()["task_id"]
+
+    queued = client.get(f"/tasks/{task_id}")
+    assert queued.json()["status"] == "queued"
+    etag = queued.headers["ETag"]
+    assert client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/tasks/{task_id}", params={"wait": 0.05}).json()["status"] == "queued"
+    assert client.get("/tasks/missing").status_code == 404
+
+    with ThreadPoolExecutor(1) as pool:
+        parked = pool.submit(client.get, f"/tasks/{task_id}", params={"wait": 10})
+        deadline = time.monotonic() + 5
+        while not main.waiters.count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.portal.call(main.on_event, {
+            "event": "updated", "task_id": task_id, "status": "done", "summary": "Done.",
+        })
+        done = parked.result(timeout=5)
+
+    assert done.json()["summary"] == "Done." and done.headers["ETag"] != etag
+    # Served from the recent results, so it is consistent before the DB flush.
+    assert client.get(f"/tasks/{task_id}").json()["status"] == "done"
+
+    events = client.get(f"/tasks/{task_id}/events")
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert events.text.startswith("event: state\n") and '"summary": "Done."' in events.text
+    assert client.get("/tasks/missing/events").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_result_waiters_resolve_futures_and_streams():
+    """Test that result events resolve long polls and reach task and batch streams."""
+    from waiters import ResultWaiters
+
+    waiters = ResultWaiters(recent_size=1, queue_size=2)
+    future = waiters.future("b-00000000")
+    task_stream = waiters.subscribe("b-00000000")
+    batch_stream = waiters.subscribe("b")
+
+    waiters.publish({"event": "partial", "task_id": "b-00000000", "seq": 0, "delta": "Hi"})
+    assert not future.done()
+    updated = {
+        "event": "updated", "task_id": "b-00000000", "batch_id": "b",
+        "status": "done", "summary": "Hi",
+    }
+    waiters.publish(updated)
+    assert future.result() == updated
+    assert [task_stream.get_nowait()["event"] for _ in range(2)] == ["partial", "updated"]
+    assert batch_stream.get_nowait() == updated
+    assert waiters.recent("b-00000000") == {"status": "done", "summary": "Hi"}
+
+    for index in range(1, 4):
+        waiters.publish({**updated, "task_id": f"b-{index:08d}"})
+    assert waiters.recent("b-00000000") is None
+    # The batch stream overflowed: it is told to end instead of silently losing events.
+    assert batch_stream.get_nowait() is None
+
+
+def test_list_tasks_status_filter_and_preview(client, long_text):
+    """Test status filtering and text previews."""
+    with patch('main.publish_task'):
+        client.post("/summarize", json={"text": long_text})
+
+    response = client.get("/tasks", params={"status": "queued", "preview": 20})
+    assert response.status_code == 200
+    data = response.json()
+    assert data
+    assert all(t["status"] == "queued" for t in data)
+    assert all(len(t["text"]) <= 20 for t in data)
+
+
+def test_task_stats(client):
+    """Test that stats are aggregated per status."""
+    response = client.get("/tasks/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == sum(data["by_status"].values())
+
+
+@pytest.mark.asyncio
+async def test_result_writer_batches_updates_in_one_flush():
+    """Test that buffered results are written together and the latest one wins."""
+    from db import SessionLocal, Task, init_models
+    from result_writer import ResultWriter
+
+    prefix = f"flush-{uuid.uuid4().hex}"
+    await init_models()
+    async with SessionLocal() as db:
+        db.add_all([Task(id=f"{prefix}-{i}", text="t") for i in range(3)])
+        await db.commit()
+
+    writer = ResultWriter(flush_interval_ms=10_000, max_batch=100)
+    writer.add(f"{prefix}-0", "done", "first")
+    writer.add(f"{prefix}-1", "done", "second")
+    writer.add(f"{prefix}-0", "done", "latest")
+    writer.add("missing-task", "done", "ignored")
+    await writer.stop()
+
+    async with SessionLocal() as db:
+        tasks = {t.id: t for t in await db.scalars(select(Task).where(Task.id.like(f"{prefix}-%")))}
+    assert tasks[f"{prefix}-0"].summary == "latest"
+    assert tasks[f"{prefix}-1"].summary == "second"
+    assert tasks[f"{prefix}-2"].status == "queued"
+
+
+@pytest.mark.asyncio
+async def test_result_writer_holds_back_producers_while_flushes_fail():
+    """Test that a full buffer blocks producers until a flush succeeds, without losing rows."""
+    import asyncio
+    from db import init_models
+    from result_writer import ResultWriter
+
+    await init_models()
+    writer = ResultWriter(flush_interval_ms=10, max_batch=100, max_buffered=2)
+    writer.start()
+    with patch('result_writer.SessionLocal', side_effect=ConnectionError("database is down")):
+        writer.add("held-1", "done", "first")
+        writer.add("held-2", "done", "second")
+        waiting = asyncio.create_task(writer.wait_for_room())
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        assert len(writer._buffer) == 2
+
+    await asyncio.wait_for(waiting, timeout=5)
+    assert not writer._buffer
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_retention_archives_expired_tasks_and_restores_them(tmp_path):
+    """Test that expired tasks move to a dated zstd archive and can be put back for a TTL."""
+    from datetime import datetime
+    from db import SessionLocal, Task, init_models
+    from retention import RetentionJob, read_records, restore
+
+    await init_models()
+    async with SessionLocal() as db:
+        db.add_all([
+            Task(id="retention-old", text="t", summary="s", status="done",
+                 created_at=datetime(2000, 1, 2, 12)),
+            Task(id="retention-recent", text="t", status="done", created_at=datetime(2020, 1, 1)),
+        ])
+        await db.commit()
+
+    job = RetentionJob(ttl_days={"done": 3650}, archive_dir=str(tmp_path), batch_size=1,
+                       pause_ms=0, interval_seconds=3600, vacuum_pages=100)
+    assert await job.run_once() == {"done": 1}
+    assert (tmp_path / "date=2000-01-02" / "tasks.jsonl.zst").exists()
+    assert [r["id"] for r in read_records(tmp_path)] == ["retention-old"]
+
+    async with SessionLocal() as db:
+        assert await db.get(Task, "retention-old") is None
+        assert await db.get(Task, "retention-recent") is not None
+
+    assert await restore(str(tmp_path), task_ids={"retention-old"}) == 1
+    assert await restore(str(tmp_path), task_ids={"retention-old"}) == 0
+    # The next pass leaves the restored task alone.
+    assert await job.run_once() == {"done": 0}
+    assert [r["id"] for r in read_records(tmp_path)] == ["retention-old"]
+    async with SessionLocal() as db:
+        task = await db.get(Task, "retention-old")
+        assert (task.summary, task.created_at) == ("s", datetime(2000, 1, 2, 12))
+        assert task.restored_at is not None
+        await db.delete(task)
+        await db.delete(await db.get(Task, "retention-recent"))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_does_not_wait_for_slow_clients():
+    """Test that a stalled client is dropped while others keep receiving events."""
+    import asyncio
+    from connections import ConnectionManager
+
+    manager = ConnectionManager(queue_size=2, send_timeout=5)
+    stalled = asyncio.Event()
+
+    fast_ws = AsyncMock()
+    async def stall(message):
+        await stalled.wait()
+
+    slow_ws = AsyncMock()
+    slow_ws.send_json.side_effect = stall
+
+    fast = await manager.connect(fast_ws)
+    slow = await manager.connect(slow_ws)
+
+    for i in range(4):
+        manager.broadcast({"event": "updated", "task_id": f"t{i}"})
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.01)
+
+    assert fast in manager.connections
+    assert slow not in manager.connections
+    assert fast_ws.send_json.call_count == 4
+    slow_ws.close.assert_called_once()
+    assert not manager._closing
+    manager.disconnect(fast)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_respects_task_subscriptions():
+    """Test that subscribed clients only receive events for their tasks."""
+    import asyncio
+    from connections import ConnectionManager
+
+    manager = ConnectionManager(queue_size=10, send_timeout=5)
+    ws = AsyncMock()
+    connection = await manager.connect(ws, {"mine"})
+
+    manager.broadcast({"event": "updated", "task_id": "other"})
+    manager.broadcast({"event": "updated", "task_id": "mine"})
+    connection.subscribe(["later"])
+    manager.broadcast({"event": "updated", "task_id": "later"})
+    await asyncio.sleep(0.01)
+
+    sent = [call.args[0]["task_id"] for call in ws.send_json.call_args_list]
+    assert sent == ["mine", "later"]
+    manager.disconnect(connection)
+
+
+def test_websocket_subscription_filters_events(client):
+    """Test subscribing over the socket with the task_ids query parameter."""
+    with client.websocket_connect("/ws?task_ids=abc") as websocket:
+        websocket.send_text('{"action": "subscribe", "task_ids": ["def"]}')
+        websocket.send_text("not json")
+        assert websocket is not None
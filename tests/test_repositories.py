@@ -78,6 +78,27 @@ def test_factory_creates_correct_backend():
         assert isinstance(repo, HuggingFaceRepository)
 
 
+def test_decorated_repository_closes_every_backend():
+    """Test that closing the decorated repository reaches the backends behind the router."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.factory import decorate_repository
+    from domain.repositories.router import RouterRepository
+
+    backends = {"a": Mock(), "b": Mock()}
+    with patch('domain.factory.settings') as mock_settings:
+        mock_settings.near_duplicate_enabled = False
+        mock_settings.summary_cache_enabled = True
+        repo = decorate_repository(RouterRepository(backends))
+
+    repo.close()
+
+    backends["a"].close.assert_called_once()
+    backends["b"].close.assert_called_once()
+
+
 def test_all_repositories_have_summarize():
     """Test that all repository implementations have summarize method."""
     import sys
@@ -97,3 +118,360 @@ def test_all_repositories_have_summarize():
     for repo in repositories:
         assert hasattr(repo, 'summarize')
         assert callable(repo.summarize)
+
+
+@pytest.mark.asyncio
+async def test_cached_repository_serves_repeats_from_cache(sample_text):
+    """Test that a repeated text is answered from the cache without a backend call."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.cache import SummaryCache
+    from domain.repositories.cached import CachedRepository
+
+    backend = Mock()
+    backend.summarize = AsyncMock(return_value="Cached summary")
+    backend.cache_params = Mock(return_value={"backend": "mock"})
+    repo = CachedRepository(backend, SummaryCache())
+
+    first = await repo.summarize(sample_text)
+    second = await repo.summarize("  " + sample_text.replace(" ", "\n") + "  ")
+
+    assert first == second == "Cached summary"
+    backend.summarize.assert_called_once()
+    assert repo.cache.stats == {"local_hits": 1, "redis_hits": 0, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_summary_cache_redis_tier_and_eviction():
+    """Test the Redis tier backfills the LRU and the LRU stays size-bounded."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.cache import SummaryCache, make_cache_key
+
+    redis_mock = Mock()
+    redis_mock.get = AsyncMock(return_value="From redis")
+    redis_mock.set = AsyncMock()
+    cache = SummaryCache(redis_mock, max_entries=2, ttl_seconds=60)
+
+    assert await cache.get("k1") == "From redis"
+    assert await cache.get("k1") == "From redis"
+    redis_mock.get.assert_called_once_with("k1")
+
+    await cache.set("k2", "v2")
+    await cache.set("k3", "v3")
+    assert len(cache.local) == 2
+    redis_mock.set.assert_called_with("k3", "v3", ex=60)
+
+    assert make_cache_key("text", {"model": "a"}) != make_cache_key("text", {"model": "b"})
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_repository_reuses_summary_of_near_copy(long_text):
+    """Test that a reprint with a trailing ad and other formatting reuses the stored summary."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+    fakeredis = pytest.importorskip("fakeredis")
+
+    from domain.near_duplicates import NearDuplicateIndex, lsh_bands
+    from domain.repositories.near_duplicate import NearDuplicateRepository
+
+    backend = Mock()
+    backend.summarize = AsyncMock(side_effect=["Moon summary", "Other summary"])
+    backend.cache_params = Mock(return_value={"backend": "mock"})
+    index = NearDuplicateIndex(fakeredis.FakeAsyncRedis(decode_responses=True), threshold=0.8)
+    repo = NearDuplicateRepository(backend, index)
+
+    assert await repo.summarize(long_text) == "Moon summary"
+    reprint = long_text.upper().replace(" ", "  ") + " Subscribe to our newsletter!"
+    assert await repo.summarize(reprint) == "Moon summary"
+    assert await repo.summarize("Completely different words " * 10) == "Other summary"
+    assert backend.summarize.call_count == 2
+
+    bands, rows = lsh_bands(0.9, 128)
+    assert bands * rows == 128 and 1 - (1 - 0.9 ** rows) ** bands >= 0.95
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_buckets_drop_expired_and_excess_members(long_text):
+    """Test that LSH buckets forget expired texts and keep only the newest ones."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+    fakeredis = pytest.importorskip("fakeredis")
+
+    from domain.near_duplicates import NearDuplicateIndex
+
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    index = NearDuplicateIndex(fake, threshold=0.8, ttl_seconds=100, bucket_max_members=3)
+    params = {"backend": "mock"}
+
+    # Only the index's clock moves; Redis key expiry keeps using real time.
+    with patch('domain.near_duplicates.time') as mock_time:
+        mock_time.time.return_value = 0.0
+        await index.add(long_text, params, "original")
+        mock_time.time.return_value = 150.0
+        for i in range(5):
+            tail = " ".join(f"extra{i}word{j}" for j in range(8))
+            await index.add(f"{long_text} {tail}.", params, f"variant {i}")
+        # The original entry is still stored but no bucket points at it any more.
+        assert (await index.lookup(long_text, params)).startswith("variant")
+
+    sizes = [await fake.zcard(key) async for key in fake.scan_iter("neardup:*:bucket:*")]
+    assert sizes and max(sizes) == 3
+
+
+@pytest.fixture
+def tiny_seq2seq_model(tmp_path):
+    """Save a tiny randomly initialized T5 model and word-level tokenizer to disk."""
+    pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    words = "summarize the moon landing was a historic mission by apollo crew".split()
+    vocab = {"<pad>": 0, "</s>": 1, "<unk>": 2}
+    vocab.update({word: i + 3 for i, word in enumerate(words)})
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    transformers.PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, pad_token="<pad>", eos_token="</s>", unk_token="<unk>"
+    ).save_pretrained(tmp_path)
+
+    config = transformers.T5Config(
+        vocab_size=len(vocab), d_model=16, d_kv=8, d_ff=32, num_layers=1,
+        num_heads=2, pad_token_id=0, eos_token_id=1, decoder_start_token_id=0,
+    )
+    transformers.T5ForConditionalGeneration(config).save_pretrained(tmp_path)
+    return str(tmp_path)
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_local_t5_repository_generates_in_process_pool(tiny_seq2seq_model):
+    """Test that the local backend loads weights from disk and summarizes a batch."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.repositories.local_t5 import LocalT5Repository
+
+    repo = LocalT5Repository(
+        model_path=tiny_seq2seq_model, processes=1, threads_per_process=1,
+        batch_size=2, max_new_tokens=4,
+    )
+    try:
+        results = await repo.summarize_batch(
+            ["the moon landing", "apollo crew", "a historic mission by the apollo crew"]
+        )
+        single = await repo.summarize("the moon landing")
+        pieces = [piece async for piece in repo.summarize_stream("the moon landing")]
+    finally:
+        repo.close()
+
+    assert len(results) == 3
+    assert all(isinstance(result, str) for result in results)
+    assert isinstance(single, str)
+    assert all(isinstance(piece, str) for piece in pieces)
+
+
+@pytest.mark.asyncio
+async def test_huggingface_retries_model_loading_and_retry_after():
+    """Test that 503 model loading and 429 Retry-After are waited out and retried."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    import httpx
+    from domain.repositories import huggingface
+    from domain.repositories.huggingface import HuggingFaceRepository
+
+    responses = iter([
+        httpx.Response(503, json={"error": "Model is currently loading", "estimated_time": 7.5}),
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(200, json=[{"summary_text": "Loaded summary"}]),
+    ])
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses)))
+    repo = HuggingFaceRepository(model_name="test/model", client=client)
+
+    with patch.object(huggingface.asyncio, 'sleep', new_callable=AsyncMock) as mock_sleep:
+        result = await repo.summarize("Some text")
+
+    assert result == "Loaded summary"
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [7.5, 2.0]
+
+
+@pytest.mark.asyncio
+async def test_huggingface_gives_up_when_retry_budget_is_spent():
+    """Test that an exhausted retry budget stops retries immediately."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    import httpx
+    from domain.repositories import huggingface
+    from domain.repositories.base import RetryBudget
+    from domain.repositories.huggingface import HuggingFaceRepository
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(502)))
+    repo = HuggingFaceRepository(model_name="test/model", client=client)
+    empty_budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=0.0)
+
+    with patch.object(huggingface, '_retry_budget', empty_budget), \
+         patch.object(huggingface.asyncio, 'sleep', new_callable=AsyncMock) as mock_sleep:
+        with pytest.raises(httpx.HTTPStatusError):
+            await repo.summarize("Some text")
+
+    mock_sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fake_repository_streams_the_same_summary(sample_text):
+    """Test the offline benchmark backend is deterministic and streams word by word."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.repositories.fake import FakeRepository
+
+    repo = FakeRepository(latency_ms=0, tokens_per_second=10_000, summary_words=5, error_rate=0)
+    summary = await repo.summarize(sample_text)
+    pieces = [piece async for piece in repo.summarize_stream(sample_text)]
+
+    assert summary == " ".join(sample_text.split()[:5])
+    assert len(pieces) == 5 and "".join(pieces) == summary
+
+    failing = FakeRepository(latency_ms=0, error_rate=1.0)
+    with pytest.raises(RuntimeError):
+        await failing.summarize(sample_text)
+
+
+@pytest.mark.asyncio
+async def test_extractive_repository_ranks_central_sentences():
+    """Test TextRank picks the connected sentences and batches match single calls."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.repositories.extractive import ExtractiveRepository
+
+    text = (
+        "The Apollo 11 mission landed the first humans on the Moon. "
+        "Pizza is a popular food. "
+        "Armstrong and Aldrin landed the lunar module on the Moon in 1969. "
+        "The Moon landing was watched by millions of people."
+    )
+    repo = ExtractiveRepository(max_sentences=2)
+
+    summary = await repo.summarize(text)
+    assert "Pizza" not in summary
+    assert summary.startswith("The Apollo 11 mission")
+
+    texts = ["", "Only one sentence here.", text]
+    assert await repo.summarize_batch(texts) == [
+        "", "Only one sentence here.", summary,
+    ]
+
+
+def test_extractive_repository_memory_stays_bounded_on_long_documents():
+    """Test that ranking a few thousand sentences does not build per-pair row copies."""
+    import random
+    import sys
+    import os
+    import tracemalloc
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.repositories.extractive import ExtractiveRepository
+
+    rng = random.Random(7)
+    words = [f"term{i}" for i in range(300)] + ["the", "of", "and"] * 20
+    text = " ".join(
+        " ".join(rng.choices(words, k=12)).capitalize() + "." for _ in range(3000)
+    )
+
+    tracemalloc.start()
+    try:
+        [summary] = ExtractiveRepository(max_sentences=3).summarize_many([text])
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert summary.count(".") == 3
+    # The similarity graph of 3000 sentences holds about 9M links (~80 MB).
+    assert peak < 300 * 1024 * 1024
+
+
+class _SlowRepository:
+    """Minimal backend that answers after ``delay`` seconds or raises ``error``."""
+
+    def __init__(self, summary="", delay=0.0, error=None):
+        self.summary = summary
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def summarize(self, text):
+        import asyncio
+
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.summary
+
+
+@pytest.mark.asyncio
+async def test_router_hedges_slow_backend_and_cancels_loser():
+    """Test that a request outliving the hedge delay is raced against the next backend."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.repositories.router import RouterRepository
+
+    slow = _SlowRepository("slow", delay=5.0)
+    fast = _SlowRepository("fast", delay=0.01)
+    repo = RouterRepository({"slow": slow, "fast": fast}, hedge_default_delay=0.05)
+    repo.health["fast"].record_success(0.02)  # rank "slow" (untried) first
+
+    assert await repo.summarize("text") == "fast"
+    assert slow.cancelled == 1
+    assert repo.health["slow"].latency >= 0.05
+    assert repo.ranked_backends()[0] == "fast"
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_and_opens_circuit():
+    """Test that failures fall through to the next backend and trip the breaker."""
+    import sys
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'worker'))
+
+    from domain.repositories.router import RouterRepository
+
+    broken = _SlowRepository(error=RuntimeError("down"))
+    healthy = _SlowRepository("ok", delay=0.01)
+    repo = RouterRepository(
+        {"broken": broken, "healthy": healthy},
+        failure_threshold=2, reset_timeout=60.0, hedge_enabled=False,
+    )
+    repo.health["healthy"].record_success(1.0)  # rank "broken" (untried) first
+
+    assert await repo.summarize("one") == "ok"
+    assert await repo.summarize("two") == "ok"
+    assert not repo.health["broken"].available
+
+    assert await repo.summarize("three") == "ok"
+    assert broken.calls == 2
+
+    healthy.error = RuntimeError("also down")
+    with pytest.raises(RuntimeError):
+        await repo.summarize("four")
@@ -1,6 +1,8 @@
 """
 Tests for Worker and domain logic.
 """
+import asyncio
+import math
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 import sys
@@ -80,3 +82,373 @@ def test_repository_has_summarize_method():
     repo = get_repository()
     assert hasattr(repo, 'summarize')
     assert callable(repo.summarize)
+
+
+@pytest.mark.asyncio
+async def test_handle_task_reports_trace_and_backend_metrics(sample_text):
+    """Test that results carry the trace and stage timings and backend calls are measured."""
+    from prometheus_client import REGISTRY
+    from main import handle_task
+    from domain.repositories.instrumented import InstrumentedRepository
+
+    backend = Mock()
+    backend.summarize = AsyncMock(return_value="Short summary")
+    instrumented = InstrumentedRepository(backend, "mock")
+
+    with patch('main.repo', instrumented), \
+         patch('main.publish_result', new_callable=AsyncMock) as mock_publish:
+        await handle_task({
+            "task_id": "traced", "text": sample_text, "trace_id": "abc123", "enqueued_at": 0.0,
+        })
+
+    result = mock_publish.call_args.args[0]
+    assert result["trace_id"] == "abc123" and result["summary"] == "Short summary"
+    assert set(result["timings"]) == {"queue_wait", "load_text", "summarize"}
+    assert REGISTRY.get_sample_value(
+        "worker_backend_seconds_count", {"backend": "mock", "method": "summarize"}
+    ) == 1
+    assert REGISTRY.get_sample_value(
+        "worker_tokens_total", {"backend": "mock", "direction": "input"}
+    ) == math.ceil(len(sample_text) / 4)
+
+
+@pytest.mark.asyncio
+async def test_task_entry_acked_after_success():
+    """Test that a stream entry is acknowledged once the callback succeeds."""
+    import redis_client
+
+    callback = AsyncMock()
+    with patch.object(redis_client, 'redis_client') as mock_redis:
+        mock_redis.xack = AsyncMock()
+
+        await redis_client._process_entry(callback, "tasks", "1-0", {"data": '{"task_id": "t1"}'})
+
+        callback.assert_called_once_with({"task_id": "t1"})
+        mock_redis.xack.assert_called_once_with("tasks", redis_client.TASK_GROUP, "1-0")
+
+
+@pytest.mark.asyncio
+async def test_load_text_resolves_reference(long_text):
+    """Test that texts sent by reference are fetched and decompressed."""
+    import zstandard
+    import redis_client
+
+    blob = zstandard.ZstdCompressor().compress(long_text.encode("utf-8"))
+    with patch.object(redis_client, 'blob_client') as mock_blobs:
+        mock_blobs.get = AsyncMock(return_value=blob)
+
+        assert await redis_client.load_text({"task_id": "t1", "text_ref": "abc"}) == long_text
+        mock_blobs.get.assert_called_once_with("blob:abc")
+        assert await redis_client.load_text({"task_id": "t2", "text": "inline"}) == "inline"
+
+        mock_blobs.get = AsyncMock(return_value=None)
+        with pytest.raises(LookupError):
+            await redis_client.load_text({"task_id": "t3", "text_ref": "gone"})
+
+
+@pytest.mark.asyncio
+async def test_handle_fast_tasks_answers_batch_with_extractive_summaries(long_text):
+    """Test that degraded tasks are summarized together and marked as degraded."""
+    from main import handle_fast_tasks
+
+    messages = [
+        {"task_id": "t1", "text": long_text, "trace_id": "abc"},
+        {"task_id": "t2", "text_ref": "gone"},
+    ]
+
+    async def load(message):
+        if "text" not in message:
+            raise LookupError("Text gone is no longer available")
+        return message["text"]
+
+    with patch('main.load_text', side_effect=load), \
+         patch('main.publish_result', new_callable=AsyncMock) as mock_publish:
+        await handle_fast_tasks(messages)
+
+    first, second = [call.args[0] for call in mock_publish.call_args_list]
+    assert first["degraded"] and first["trace_id"] == "abc"
+    assert 0 < len(first["summary"]) < len(long_text)
+    assert second["task_id"] == "t2" and second["summary"].startswith("Error:")
+
+
+@pytest.mark.asyncio
+async def test_task_entry_left_pending_on_failure():
+    """Test that a failed entry is not acknowledged so it can be reclaimed."""
+    import redis_client
+
+    callback = AsyncMock(side_effect=Exception("boom"))
+    with patch.object(redis_client, 'redis_client') as mock_redis:
+        mock_redis.xack = AsyncMock()
+
+        await redis_client._process_entry(callback, "tasks", "1-0", {"data": '{"task_id": "t1"}'})
+
+        mock_redis.xack.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_entries_failing_too_often_are_dead_lettered():
+    """Test that an entry over the delivery limit is moved aside, answered as failed and acked."""
+    fakeredis = pytest.importorskip("fakeredis")
+    import json
+    import redis_client
+
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await fake.xgroup_create("tasks", redis_client.TASK_GROUP, id="0", mkstream=True)
+    await fake.xadd("tasks", {"data": json.dumps({"task_id": "poison", "batch_id": "b"})})
+    await fake.xadd("tasks", {"data": json.dumps({"task_id": "fine"})})
+    await fake.xreadgroup(redis_client.TASK_GROUP, "other", {"tasks": ">"})
+    # The first entry keeps failing: every reclaim delivers it again.
+    first_id = (await fake.xrange("tasks", count=1))[0][0]
+    for _ in range(2):
+        await fake.xclaim("tasks", redis_client.TASK_GROUP, "other", 0, [first_id])
+
+    with patch.object(redis_client, 'redis_client', fake), \
+         patch.object(redis_client.settings, 'task_max_deliveries', 2), \
+         patch('redis_client.publish_result', new_callable=AsyncMock) as mock_publish:
+        _start, entries, *_ = await fake.xautoclaim(
+            "tasks", redis_client.TASK_GROUP, "me", min_idle_time=0, start_id="0-0"
+        )
+        retry = await redis_client._dead_letter_exhausted("tasks", entries)
+
+    assert [json.loads(fields["data"])["task_id"] for _id, fields in retry] == ["fine"]
+    result = mock_publish.call_args.args[0]
+    assert result["task_id"] == "poison" and result["batch_id"] == "b"
+    assert result["status"] == "failed" and result["summary"].startswith("Error:")
+    dead = await fake.xrange(redis_client.DEAD_LETTER_STREAM)
+    assert [fields["entry_id"] for _id, fields in dead] == [first_id]
+    assert dead[0][1]["deliveries"] == "4"
+    pending = await fake.xpending_range("tasks", redis_client.TASK_GROUP, "-", "+", 10)
+    assert [p["message_id"] for p in pending] == [retry[0][0]]
+
+
+@pytest.mark.asyncio
+async def test_held_entries_stay_claimed_while_queue_is_full():
+    """Test that prefetched entries are touched while the reader waits for room."""
+    fakeredis = pytest.importorskip("fakeredis")
+    import json
+    import redis_client
+    from fair_queue import FairQueue
+
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    for stream in redis_client.TASK_STREAMS.values():
+        await fake.xadd(stream, {"data": json.dumps({"task_id": stream})})
+    queue = FairQueue({lane: 1 for lane in redis_client.TASK_STREAMS}, prefetch=1)
+    scheduler = Mock()
+    # No free slots: nothing leaves the queue, so the reader blocks in wait_for_room.
+    scheduler.wait_for_slot = AsyncMock(side_effect=asyncio.Event().wait)
+    held = {stream: set() for stream in redis_client.TASK_STREAMS.values()}
+
+    with patch.object(redis_client, 'redis_client', fake), \
+         patch.object(redis_client, '_held', held), \
+         patch.object(redis_client.settings, 'task_reclaim_idle_ms', 150):
+        reader = asyncio.create_task(redis_client.subscribe_tasks(AsyncMock(), scheduler, queue))
+        await asyncio.sleep(0.4)
+        assert not any(queue.room(lane) for lane in redis_client.TASK_STREAMS)
+        pending = await fake.xpending_range("tasks", redis_client.TASK_GROUP, "-", "+", 10)
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+
+    assert [p["consumer"] for p in pending] == [redis_client.CONSUMER_NAME]
+    assert pending[0]["time_since_delivered"] < 150
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_concurrency():
+    """Test that the scheduler never runs more tasks than its concurrency."""
+    import asyncio
+    from scheduler import TaskScheduler
+
+    scheduler = TaskScheduler(concurrency=2)
+    running = 0
+    peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for _ in range(6):
+        await scheduler.submit(job())
+    await scheduler.drain()
+
+    assert peak == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.free_slots == 2
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_weights_lanes_and_rotates_tenants():
+    """Test lane weights, per-tenant round robin and the tenant concurrency cap."""
+    from fair_queue import FairQueue
+
+    queue = FairQueue({"interactive": 3, "batch": 1}, prefetch=100, tenant_cap=2)
+    for i in range(20):
+        queue.put("batch", "bulk", f"bulk-{i}")
+    for i in range(6):
+        queue.put("interactive", "alice", f"alice-{i}")
+        queue.put("interactive", "bob", f"bob-{i}")
+
+    order = []
+    for _ in range(8):
+        tenant, item = await queue.get()
+        order.append(item)
+        if tenant != "bulk":
+            queue.release(tenant)
+
+    # 3 interactive turns per batch turn; alice and bob alternate.
+    assert order == [
+        "alice-0", "bob-0", "alice-1", "bulk-0",
+        "bob-1", "alice-2", "bob-2", "bulk-1",
+    ]
+    assert queue.room("batch") == 100 - 18
+
+    # "bulk" holds two unreleased tasks, so it is capped.
+    for _ in range(6):
+        tenant, _item = await queue.get()
+        queue.release(tenant)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(queue.get(), timeout=0.05)
+    queue.release("bulk")
+    tenant, item = await queue.get()
+    assert (tenant, item) == ("bulk", "bulk-2")
+
+
+@pytest.mark.asyncio
+async def test_batcher_groups_concurrent_texts():
+    """Test that concurrent texts of similar length share one batch call."""
+    import asyncio
+    from batcher import MicroBatcher
+
+    repo = Mock()
+    repo.summarize_batch = AsyncMock(side_effect=lambda texts: [t.upper() for t in texts])
+    batcher = MicroBatcher(repo, max_batch_size=3, max_wait_ms=1000, length_buckets=[100])
+
+    results = await asyncio.gather(
+        batcher.summarize("one"), batcher.summarize("two"), batcher.summarize("three")
+    )
+
+    assert results == ["ONE", "TWO", "THREE"]
+    repo.summarize_batch.assert_called_once_with(["one", "two", "three"])
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_by_wait_and_bucket():
+    """Test that partial batches flush after max wait, split by length bucket."""
+    import asyncio
+    from batcher import MicroBatcher
+
+    repo = Mock()
+    repo.summarize_batch = AsyncMock(
+        side_effect=lambda texts: [ValueError("bad") if t == "bad" else "ok" for t in texts]
+    )
+    batcher = MicroBatcher(repo, max_batch_size=8, max_wait_ms=10, length_buckets=[5])
+
+    results = await asyncio.gather(
+        batcher.summarize("bad"), batcher.summarize("a" * 50), return_exceptions=True
+    )
+
+    assert isinstance(results[0], ValueError)
+    assert results[1] == "ok"
+    assert repo.summarize_batch.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_batcher_fails_every_text_when_backend_drops_results():
+    """Test that a short result list fails the whole batch instead of leaving callers waiting."""
+    import asyncio
+    from batcher import MicroBatcher
+
+    repo = Mock()
+    repo.summarize_batch = AsyncMock(return_value=["only one"])
+    batcher = MicroBatcher(repo, max_batch_size=2, max_wait_ms=1000, length_buckets=[100])
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.summarize("one"), batcher.summarize("two"), return_exceptions=True),
+        timeout=1,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_split_into_chunks_respects_budget_and_boundaries(long_text):
+    """Test that chunks stay under budget and break between sentences."""
+    from domain.tokens import estimate_tokens
+    from pipeline import split_into_chunks
+
+    text = "\n\n".join([long_text] * 3)
+    chunks = split_into_chunks(text, max_tokens=60)
+
+    assert len(chunks) > 3
+    assert all(estimate_tokens(chunk) <= 60 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_retry_only_redoes_failed_chunks(long_text):
+    """Test hierarchical reduction and that cached chunks are not recomputed."""
+    from domain.cache import SummaryCache
+    from domain.repositories import CachedRepository
+    from pipeline import MapReduceSummarizer, split_into_chunks
+
+    calls = []
+    fail_once = {"armed": True}
+
+    async def summarize(text):
+        calls.append(text)
+        if "Collins" in text and fail_once["armed"]:
+            fail_once["armed"] = False
+            raise Exception("backend timeout")
+        return text.split(".")[0] + "."
+
+    repo = Mock()
+    repo.summarize = AsyncMock(side_effect=summarize)
+    repo.cache_params = Mock(return_value={"backend": "mock"})
+    pipeline = MapReduceSummarizer(
+        CachedRepository(repo, SummaryCache()), max_direct_tokens=80, chunk_tokens=60,
+        concurrency=2,
+    )
+
+    chunks = split_into_chunks(long_text, 60)
+    assert len(chunks) > 2
+
+    with pytest.raises(Exception):
+        await pipeline.summarize(long_text)
+    assert sorted(calls) == sorted(chunks)
+
+    calls.clear()
+    summary = await pipeline.summarize(long_text)
+
+    retried_chunks = [text for text in calls if text in chunks]
+    assert summary
+    assert len(retried_chunks) == 1
+    assert "Collins" in retried_chunks[0]
+
+
+@pytest.mark.asyncio
+async def test_handle_task_streams_partials(sample_text):
+    """Test that streamed pieces are published in order before the final result."""
+    from main import handle_task
+
+    async def fake_stream(text):
+        for piece in ["AI ", "is ", "everywhere."]:
+            yield piece
+
+    with patch('main.repo') as mock_repo, \
+         patch('main.publish_result', new_callable=AsyncMock) as mock_publish, \
+         patch('main.publish_event', new_callable=AsyncMock) as mock_event, \
+         patch('main.settings.stream_partials', True):
+        mock_repo.summarize_stream = fake_stream
+
+        await handle_task({"task_id": "stream-1", "text": sample_text})
+
+        partials = [call.args[0] for call in mock_event.call_args_list]
+        assert [m["event"] for m in partials] == ["partial"] * 3
+        assert [m["seq"] for m in partials] == [0, 1, 2]
+        mock_publish.assert_called_once()
+        result = mock_publish.call_args.args[0]
+        assert result["task_id"] == "stream-1"
+        assert result["summary"] == "AI is everywhere."
@@ -0,0 +1,70 @@
+import asyncio
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Groups concurrent ``summarize`` calls into ``summarize_batch`` calls.
+
+    Texts are bucketed by length so one long document does not pad a
+    batch of short ones. A bucket is flushed as soon as it holds
+    ``max_batch_size`` texts or its oldest text has waited ``max_wait_ms``.
+    """
+
+    def __init__(self, repo, max_batch_size: int, max_wait_ms: float, length_buckets: list[int]):
+        self.repo = repo
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.length_buckets = sorted(length_buckets)
+        self._pending: dict[int, list[tuple[str, asyncio.Future]]] = {}
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+        self._running: set[asyncio.Task] = set()
+
+    async def summarize(self, text: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        bucket = bisect.bisect_left(self.length_buckets, len(text))
+
+        items = self._pending.setdefault(bucket, [])
+        items.append((text, future))
+        if len(items) >= self.max_batch_size:
+            self._flush(bucket)
+        elif len(items) == 1:
+            self._timers[bucket] = loop.call_later(self.max_wait, self._flush, bucket)
+
+        return await future
+
+    def _flush(self, bucket: int):
+        timer = self._timers.pop(bucket, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(bucket, None)
+        if not items:
+            return
+        task = asyncio.create_task(self._run_batch(items))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, items: list[tuple[str, asyncio.Future]]):
+        logger.info(f"Running batch of {len(items)} texts")
+        try:
+            results = await self.repo.summarize_batch([text for text, _ in items])
+        except Exception as e:
+            results = [e] * len(items)
+        if len(results) != len(items):
+            # Pairing them up would leave the unmatched callers waiting forever.
+            error = RuntimeError(
+                f"Backend returned {len(results)} summaries for {len(items)} texts"
+            )
+            logger.error(str(error))
+            results = [error] * len(items)
+
+        for (_, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "summary:"
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially reformatted copies share a cache entry."""
+    return " ".join(text.split())
+
+
+def make_cache_key(text: str, params: dict) -> str:
+    """Build a content-addressed key from the normalized text and model parameters."""
+    payload = json.dumps(params, sort_keys=True) + "\n" + normalize_text(text)
+    return CACHE_KEY_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SummaryCache:
+    """Two-tier summary cache: a local LRU in front of a shared Redis tier.
+
+    Redis entries expire after ``ttl_seconds``; their total size is bounded
+    by the server's maxmemory eviction policy. Redis errors are logged and
+    treated as misses so the cache never fails a task.
+    """
+
+    def __init__(self, redis_client=None, max_entries: int = 1024, ttl_seconds: int = 86400,
+                 name: str = "summary"):
+        self.local = LRUCache(max_entries, ttl_seconds)
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _count(self, result: str):
+        self.stats[result] += 1
+        CACHE_LOOKUPS.labels(self.name, result).inc()
+
+    async def get(self, key: str) -> str | None:
+        value = self.local.get(key)
+        if value is not None:
+            self._count("local_hits")
+            return value
+
+        if self.redis is not None:
+            try:
+                value = await self.redis.get(key)
+            except Exception as e:
+                logger.warning(f"Summary cache read failed: {e}")
+                value = None
+            if value is not None:
+                self._count("redis_hits")
+                self.local.set(key, value)
+                return value
+
+        self._count("misses")
+        return None
+
+    async def set(self, key: str, value: str):
+        self.local.set(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, value, ex=self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Summary cache write failed: {e}")
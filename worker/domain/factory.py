@@ -1,4 +1,10 @@
-from domain.repositories import HuggingFaceRepository, LocalT5Repository, OpenAIRepository
+from domain.cache import SummaryCache
+from domain.near_duplicates import NearDuplicateIndex
+from domain.repositories import (
+    CachedRepository, ExtractiveRepository, FakeRepository, HuggingFaceRepository,
+    InstrumentedRepository, LocalT5Repository, NearDuplicateRepository, OpenAIRepository,
+    RouterRepository,
+)
 from settings import settings
 from domain.interfaces import ModelRepository
 
@@ -6,11 +12,60 @@ from domain.interfaces import ModelRepository
 def get_repository() -> ModelRepository:
     repo_type = getattr(settings, "model_backend", "huggingface")
 
+    if repo_type == "router":
+        return RouterRepository(
+            {name: create_backend(name) for name in settings.router_backends},
+            ewma_alpha=settings.router_ewma_alpha,
+            latency_window=settings.router_latency_window,
+            failure_threshold=settings.router_failure_threshold,
+            reset_timeout=settings.router_reset_timeout,
+            hedge_enabled=settings.router_hedge_enabled,
+            hedge_min_delay=settings.router_hedge_min_delay,
+            hedge_default_delay=settings.router_hedge_default_delay,
+        )
+    return create_backend(repo_type)
+
+
+def create_backend(repo_type: str) -> ModelRepository:
     if repo_type == "huggingface":
         return HuggingFaceRepository()
     elif repo_type == "local_t5":
         return LocalT5Repository()
     elif repo_type == "openai":
         return OpenAIRepository()
+    elif repo_type == "extractive":
+        return ExtractiveRepository()
+    elif repo_type == "fake":
+        return FakeRepository()
+    else:
+        raise ValueError(f"Unknown model backend: {repo_type}")
+
+
+def decorate_repository(repo: ModelRepository, redis_client=None) -> ModelRepository:
+    """Wrap a backend repository with the layers enabled in settings."""
+    if isinstance(repo, RouterRepository):
+        # Time each routed backend separately rather than the router as a whole.
+        repo.backends = {
+            name: InstrumentedRepository(backend, name) for name, backend in repo.backends.items()
+        }
     else:
-        raise ValueError(f"Unknown model backend: {repo_type}")
\ No newline at end of file
+        repo = InstrumentedRepository(repo, repo.cache_params()["backend"])
+    if settings.near_duplicate_enabled and redis_client is not None:
+        index = NearDuplicateIndex(
+            redis_client,
+            threshold=settings.near_duplicate_threshold,
+            num_perm=settings.near_duplicate_num_perm,
+            shingle_size=settings.near_duplicate_shingle_size,
+            ttl_seconds=settings.near_duplicate_ttl_seconds,
+            min_words=settings.near_duplicate_min_words,
+            bucket_max_members=settings.near_duplicate_bucket_max_members,
+        )
+        repo = NearDuplicateRepository(repo, index)
+    if settings.summary_cache_enabled:
+        cache = SummaryCache(
+            redis_client,
+            max_entries=settings.summary_cache_max_entries,
+            ttl_seconds=settings.summary_cache_ttl_seconds,
+        )
+        repo = CachedRepository(repo, cache)
+    return repo
@@ -1,4 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 
 
 class ModelRepository(ABC):
@@ -7,11 +9,56 @@ class ModelRepository(ABC):
     @abstractmethod
     async def summarize(self, text: str) -> str:
         """Generate a summary for the input text.
-        
+
         Args:
             text: The input text to summarize
-            
+
         Returns:
             A summarized version of the input text
         """
-        ...
\ No newline at end of file
+        ...
+
+    async def summarize_batch(self, texts: list[str]) -> list[str | Exception]:
+        """Generate summaries for several texts at once.
+
+        The default runs ``summarize`` concurrently; backends that can do
+        real batched inference override it.
+
+        Args:
+            texts: The input texts to summarize
+
+        Returns:
+            One entry per input, in order. A failed item is returned as the
+            exception instance so it does not fail the rest of the batch.
+        """
+        return list(await asyncio.gather(
+            *(self.summarize(text) for text in texts), return_exceptions=True
+        ))
+
+    async def summarize_stream(self, text: str) -> AsyncIterator[str]:
+        """Generate a summary incrementally.
+
+        The default yields the complete summary once; backends that can
+        stream tokens override it.
+
+        Args:
+            text: The input text to summarize
+
+        Yields:
+            Consecutive pieces of the summary
+        """
+        yield await self.summarize(text)
+
+    def cache_params(self) -> dict:
+        """Parameters that change the output for the same input text.
+
+        Used to key cached summaries, so two repositories that would produce
+        different summaries must return different parameters.
+        """
+        return {"backend": type(self).__name__}
+
+    def close(self):
+        """Release what the backend holds, such as worker processes.
+
+        Called once when the worker stops; the default has nothing to release.
+        """
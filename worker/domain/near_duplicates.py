@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import re
+import time
+import zlib
+import numpy as np
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUPLICATE_PREFIX = "neardup:"
+
+_WORD = re.compile(r"\w+")
+# Mersenne prime 2^61 - 1; with a < 2^31 and x < 2^32, a * x + b stays below 2^64.
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int) -> np.ndarray:
+    """CRC32 hashes of the word ``size``-grams of ``text``, ignoring case and punctuation."""
+    words = _WORD.findall(text.lower())
+    grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64)
+
+
+class MinHasher:
+    """MinHash signatures from ``num_perm`` universal hash functions."""
+
+    def __init__(self, num_perm: int, shingle_size: int, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingles(text, self.shingle_size)
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def lsh_bands(threshold: float, num_perm: int, min_recall: float = 0.95) -> tuple[int, int]:
+    """Pick ``(bands, rows)`` with ``bands * rows == num_perm`` for an LSH index.
+
+    A pair with Jaccard similarity ``s`` shares a bucket with probability
+    ``1 - (1 - s**rows)**bands``. Take the most rows (fewest false
+    candidates) that still find pairs at ``threshold`` with ``min_recall``;
+    candidates below the threshold are then dropped by comparing signatures.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= min_recall:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of summarized texts, shared by all workers through Redis.
+
+    Each text is stored once as its signature and summary; each of its LSH
+    bands adds the text id to a bucket, a sorted set scored by insert time.
+    A lookup reads the newest ``bucket_max_members`` ids of every band's
+    bucket and then the candidate entries, two pipelined round trips, and
+    returns the summary of the most similar candidate whose estimated
+    Jaccard similarity reaches ``threshold``. Entries expire after
+    ``ttl_seconds``; an add drops expired ids from its buckets and trims
+    them to ``bucket_max_members``, so lookups cost the same however long
+    the index has been filling. Texts of fewer than ``min_words`` words are
+    skipped. Redis errors are logged and treated as misses.
+    """
+
+    def __init__(self, redis_client, threshold: float = 0.9, num_perm: int = 128,
+                 shingle_size: int = 3, ttl_seconds: int = 86400, min_words: int = 20,
+                 bucket_max_members: int = 32, name: str = "near_duplicate"):
+        self.redis = redis_client
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self.ttl_seconds = ttl_seconds
+        self.min_words = min_words
+        self.bucket_max_members = bucket_max_members
+        self.name = name
+
+    def _keys(self, text: str, params: dict) -> tuple[np.ndarray, str, list[str]] | None:
+        if len(text.split()) < self.min_words:
+            return None
+        namespace = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        prefix = f"{NEAR_DUPLICATE_PREFIX}{namespace[:16]}:"
+        signature = self.hasher.signature(text)
+        buckets = [
+            f"{prefix}bucket:{band}:"
+            + hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                              digest_size=8).hexdigest()
+            for band in range(self.bands)
+        ]
+        text_id = hashlib.blake2b(signature.tobytes(), digest_size=16).hexdigest()
+        return signature, f"{prefix}text:{text_id}", buckets
+
+    async def lookup(self, text: str, params: dict) -> str | None:
+        keys = self._keys(text, params)
+        if keys is None:
+            return None
+        signature, _entry_key, buckets = keys
+        try:
+            oldest = time.time() - self.ttl_seconds
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for bucket in buckets:
+                    pipe.zrevrangebyscore(
+                        bucket, "+inf", oldest, start=0, num=self.bucket_max_members
+                    )
+                members = await pipe.execute()
+            candidates = sorted(set().union(*members))
+            entries = await self.redis.mget(candidates) if candidates else []
+        except Exception as e:
+            logger.warning(f"Near-duplicate lookup failed: {e}")
+            entries = []
+
+        best, best_similarity = None, self.threshold
+        for raw in entries:
+            if raw is None:
+                continue
+            entry = json.loads(raw)
+            other = np.frombuffer(bytes.fromhex(entry["signature"]), dtype=np.uint32)
+            similarity = float(np.mean(other == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = entry["summary"], similarity
+        CACHE_LOOKUPS.labels(self.name, "hits" if best is not None else "misses").inc()
+        return best
+
+    async def add(self, text: str, params: dict, summary: str):
+        keys = self._keys(text, params)
+        if keys is None:
+            return
+        signature, entry_key, buckets = keys
+        entry = json.dumps({"signature": signature.tobytes().hex(), "summary": summary})
+        try:
+            now = time.time()
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(entry_key, entry, ex=self.ttl_seconds)
+                for bucket in buckets:
+                    pipe.zadd(bucket, {entry_key: now})
+                    pipe.zremrangebyscore(bucket, "-inf", now - self.ttl_seconds)
+                    pipe.zremrangebyrank(bucket, 0, -self.bucket_max_members - 1)
+                    pipe.expire(bucket, self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Near-duplicate index write failed: {e}")
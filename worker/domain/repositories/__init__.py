@@ -1,7 +1,15 @@
+from .cached import CachedRepository
+from .extractive import ExtractiveRepository
+from .fake import FakeRepository
 from .huggingface import HuggingFaceRepository
+from .instrumented import InstrumentedRepository
 from .local_t5 import LocalT5Repository
+from .near_duplicate import NearDuplicateRepository
 from .openai_api import OpenAIRepository
+from .router import RouterRepository
 
 __all__ = [
-    "HuggingFaceRepository", "LocalT5Repository", "OpenAIRepository",
-]
\ No newline at end of file
+    "CachedRepository", "ExtractiveRepository", "FakeRepository", "HuggingFaceRepository",
+    "InstrumentedRepository", "LocalT5Repository", "NearDuplicateRepository", "OpenAIRepository",
+    "RouterRepository",
+]
@@ -0,0 +1,101 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+import httpx
+
+_http_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_http_client(name: str, **kwargs) -> httpx.AsyncClient:
+    """Return the long-lived client for backend ``name``, creating it on first use.
+
+    Sharing one client per backend keeps connections (and HTTP/2 streams)
+    alive across tasks instead of paying a TCP/TLS handshake per call.
+    """
+    client = _http_clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**kwargs)
+        _http_clients[name] = client
+    return client
+
+
+async def close_http_clients():
+    for client in _http_clients.values():
+        await client.aclose()
+    _http_clients.clear()
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Client-side rate limiter: ``rate`` requests per second with bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RetryBudget:
+    """Limits retries to a fraction of requests so they cannot amplify an outage.
+
+    Every request deposits ``ratio`` of a retry token and every retry spends
+    one. ``min_per_second`` tokens trickle in regardless, so low-traffic
+    backends can still retry occasionally.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float = 1.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated_at) * self.min_per_second)
+        self.updated_at = now
+
+    def record_request(self):
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
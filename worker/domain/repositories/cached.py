@@ -0,0 +1,53 @@
+from domain.cache import SummaryCache, make_cache_key
+from domain.interfaces import ModelRepository
+
+
+class CachedRepository(ModelRepository):
+    """Serves repeated texts from a SummaryCache instead of the wrapped backend."""
+
+    def __init__(self, repo: ModelRepository, cache: SummaryCache):
+        self.repo = repo
+        self.cache = cache
+
+    def cache_params(self) -> dict:
+        return self.repo.cache_params()
+
+    def close(self):
+        self.repo.close()
+
+    async def summarize(self, text: str) -> str:
+        key = make_cache_key(text, self.repo.cache_params())
+        summary = await self.cache.get(key)
+        if summary is not None:
+            return summary
+
+        summary = await self.repo.summarize(text)
+        await self.cache.set(key, summary)
+        return summary
+
+    async def summarize_stream(self, text: str):
+        key = make_cache_key(text, self.repo.cache_params())
+        summary = await self.cache.get(key)
+        if summary is not None:
+            yield summary
+            return
+
+        parts = []
+        async for part in self.repo.summarize_stream(text):
+            parts.append(part)
+            yield part
+        await self.cache.set(key, "".join(parts).strip())
+
+    async def summarize_batch(self, texts: list[str]) -> list[str | Exception]:
+        params = self.repo.cache_params()
+        keys = [make_cache_key(text, params) for text in texts]
+        results: list[str | Exception | None] = [await self.cache.get(key) for key in keys]
+
+        missing = [i for i, summary in enumerate(results) if summary is None]
+        if missing:
+            summaries = await self.repo.summarize_batch([texts[i] for i in missing])
+            for i, summary in zip(missing, summaries):
+                results[i] = summary
+                if not isinstance(summary, Exception):
+                    await self.cache.set(keys[i], summary)
+        return results
@@ -0,0 +1,157 @@
+import asyncio
+import re
+import numpy as np
+from scipy import sparse
+from domain.interfaces import ModelRepository
+from settings import settings
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_WORD = re.compile(r"\w+")
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+class ExtractiveRepository(ModelRepository):
+    """TextRank over TF-IDF sentence vectors; no network and no model weights.
+
+    ``summarize_batch`` builds a single sparse term matrix for every sentence
+    of every document and ranks all documents in the same power iteration.
+    IDF is computed per document (sentences are the "documents"), so a text
+    gets the same summary alone or in a batch.
+    """
+
+    def __init__(
+        self,
+        max_sentences: int | None = None,
+        damping: float | None = None,
+        max_iterations: int | None = None,
+        tolerance: float | None = None,
+    ):
+        self.max_sentences = max_sentences or settings.extractive_max_sentences
+        self.damping = damping or settings.extractive_damping
+        self.max_iterations = max_iterations or settings.extractive_max_iterations
+        self.tolerance = tolerance or settings.extractive_tolerance
+
+    def cache_params(self) -> dict:
+        return {
+            "backend": "extractive",
+            "max_sentences": self.max_sentences,
+            "damping": self.damping,
+        }
+
+    async def summarize(self, text: str) -> str:
+        [summary] = await self.summarize_batch([text])
+        return summary
+
+    async def summarize_batch(self, texts: list[str]) -> list[str | Exception]:
+        return await asyncio.to_thread(self.summarize_many, texts)
+
+    def summarize_many(self, texts: list[str]) -> list[str]:
+        """Synchronous batch summarization."""
+        documents = [split_sentences(text) for text in texts]
+        sizes = np.array([len(sentences) for sentences in documents], dtype=np.int64)
+        sentences = [sentence for doc in documents for sentence in doc]
+        if not sentences:
+            return ["" for _ in texts]
+
+        doc_of = np.repeat(np.arange(len(documents)), sizes)
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        scores = self._rank(self._tfidf(sentences, doc_of, sizes), doc_of, sizes, offsets)
+
+        # Keep the best max_sentences of each document, in their original order.
+        order = np.lexsort((-scores, doc_of))
+        rank_in_doc = np.arange(len(order)) - offsets[doc_of[order]]
+        keep = np.sort(order[rank_in_doc < self.max_sentences])
+
+        picked: list[list[str]] = [[] for _ in texts]
+        for index in keep:
+            picked[doc_of[index]].append(sentences[index])
+        return [" ".join(doc) for doc in picked]
+
+    @staticmethod
+    def _tfidf(sentences: list[str], doc_of: np.ndarray, sizes: np.ndarray) -> sparse.csr_matrix:
+        vocabulary: dict[str, int] = {}
+        indptr = [0]
+        indices: list[int] = []
+        for sentence in sentences:
+            for word in _WORD.findall(sentence.lower()):
+                indices.append(vocabulary.setdefault(word, len(vocabulary)))
+            indptr.append(len(indices))
+
+        counts = sparse.csr_matrix(
+            (np.ones(len(indices)), np.array(indices, dtype=np.int64), np.array(indptr)),
+            shape=(len(sentences), max(1, len(vocabulary))),
+        )
+        counts.sum_duplicates()
+        rows = np.repeat(np.arange(len(sentences)), np.diff(counts.indptr))
+
+        # Document frequency of each (document, term) pair, counted over sentences.
+        keys = doc_of[rows] * counts.shape[1] + counts.indices
+        _unique, inverse, df = np.unique(keys, return_inverse=True, return_counts=True)
+        n = sizes[doc_of[rows]]
+        idf = np.log((1 + n) / (1 + df[inverse])) + 1
+
+        counts.data = (1 + np.log(counts.data)) * idf
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ counts
+
+    @staticmethod
+    def _similarity(vectors: sparse.csr_matrix, sizes: np.ndarray,
+                    offsets: np.ndarray) -> sparse.csr_matrix:
+        """Cosine similarity of distinct sentences of the same document.
+
+        Each document is multiplied on its own and the blocks are laid out on
+        the diagonal, so memory grows with the linked pairs of the largest
+        document rather than with every pair in the batch.
+        """
+        blocks = []
+        for start, size in zip(offsets, sizes):
+            block = vectors[start:start + size]
+            block = (block @ block.T).tocsr()
+            rows = np.repeat(np.arange(size, dtype=block.indices.dtype), np.diff(block.indptr))
+            block.data[block.indices == rows] = 0
+            block.eliminate_zeros()
+            blocks.append((int(start), block))
+        if len(blocks) == 1:
+            return blocks[0][1]
+
+        indptr, linked = [np.zeros(1, dtype=np.int64)], 0
+        for _start, block in blocks:
+            indptr.append(block.indptr[1:] + linked)
+            linked += block.nnz
+        total = vectors.shape[0]
+        return sparse.csr_matrix(
+            (
+                np.concatenate([block.data for _start, block in blocks]),
+                np.concatenate([block.indices + start for start, block in blocks]),
+                np.concatenate(indptr),
+            ),
+            shape=(total, total),
+        )
+
+    def _rank(self, vectors: sparse.csr_matrix, doc_of: np.ndarray, sizes: np.ndarray,
+              offsets: np.ndarray) -> np.ndarray:
+        graph = self._similarity(vectors, sizes, offsets)
+        out_weight = np.asarray(graph.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        out_weight[dangling] = 1
+        # The graph is symmetric, so scaling its columns in place gives the
+        # transposed transition matrix without copying it.
+        graph.data /= out_weight[graph.indices]
+        transition = graph
+
+        n = sizes[doc_of].astype(float)
+        scores = 1 / n
+        for _ in range(self.max_iterations):
+            # Sentences without links spread their score evenly within their document.
+            spread = np.bincount(doc_of, weights=scores * dangling, minlength=len(sizes))
+            spread = spread[doc_of] / n
+            updated = (1 - self.damping) / n + self.damping * (transition @ scores + spread)
+            converged = np.abs(updated - scores).max() < self.tolerance
+            scores = updated
+            if converged:
+                break
+        return scores
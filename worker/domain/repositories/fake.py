@@ -0,0 +1,55 @@
+import asyncio
+import random
+from domain.interfaces import ModelRepository
+from settings import settings
+
+
+class FakeRepository(ModelRepository):
+    """Offline backend with synthetic latency, for benchmarks and local runs.
+
+    Each call waits for a log-normally distributed time to first token
+    (median ``latency_ms``, spread ``latency_sigma``) and then emits the
+    summary at ``tokens_per_second``. The summary is the first
+    ``summary_words`` words of the input. ``error_rate`` of calls fail.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float | None = None,
+        latency_sigma: float | None = None,
+        tokens_per_second: float | None = None,
+        summary_words: int | None = None,
+        error_rate: float | None = None,
+        seed: int | None = None,
+    ):
+        self.latency_ms = settings.fake_latency_ms if latency_ms is None else latency_ms
+        self.latency_sigma = settings.fake_latency_sigma if latency_sigma is None else latency_sigma
+        self.tokens_per_second = tokens_per_second or settings.fake_tokens_per_second
+        self.summary_words = summary_words or settings.fake_summary_words
+        self.error_rate = settings.fake_error_rate if error_rate is None else error_rate
+        self.random = random.Random(seed)
+
+    def cache_params(self) -> dict:
+        return {"backend": "fake", "summary_words": self.summary_words}
+
+    def _first_token_delay(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+
+    def _words(self, text: str) -> list[str]:
+        if self.random.random() < self.error_rate:
+            raise RuntimeError("Synthetic backend failure")
+        return text.split()[:self.summary_words]
+
+    async def summarize(self, text: str) -> str:
+        words = self._words(text)
+        await asyncio.sleep(self._first_token_delay() + len(words) / self.tokens_per_second)
+        return " ".join(words)
+
+    async def summarize_stream(self, text: str):
+        words = self._words(text)
+        await asyncio.sleep(self._first_token_delay())
+        for i, word in enumerate(words):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield word if i == 0 else " " + word
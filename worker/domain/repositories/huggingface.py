@@ -1,22 +1,94 @@
+import asyncio
+import logging
 import httpx
 from domain.interfaces import ModelRepository
+from domain.repositories.base import (
+    RetryBudget, TokenBucket, backoff_delay, get_http_client, retry_after_seconds,
+)
 from settings import settings
 
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Shared by every HuggingFaceRepository in the process.
+_rate_limiter = TokenBucket(settings.huggingface_rate_limit, settings.huggingface_rate_burst)
+_retry_budget = RetryBudget(settings.http_retry_budget_ratio)
+
 
 class HuggingFaceRepository(ModelRepository):
     """HuggingFace API implementation for text summarization."""
 
-    def __init__(self, model_name: str | None = None):
-        self.model_name = model_name or settings.model_name
+    def __init__(self, model_name: str | None = None, client: httpx.AsyncClient | None = None):
+        self.model_name = model_name or settings.huggingface_model_name
         self.api_key = settings.huggingface_api_key
         self.url = f"https://api-inference.huggingface.co/models/{self.model_name}"
+        self.client = client or get_http_client(
+            "huggingface",
+            http2=True,
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+        )
 
-    async def summarize(self, text: str) -> str:
+    def cache_params(self) -> dict:
+        return {"backend": "huggingface", "model": self.model_name}
+
+    async def _post(self, payload: dict):
         headers = {"Authorization": f"Bearer {self.api_key}"}
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(self.url, headers=headers, json={"inputs": text})
-            response.raise_for_status()
-            data = response.json()
+        attempt = 0
+        while True:
+            await _rate_limiter.acquire()
+            _retry_budget.record_request()
+            delay = None
+            try:
+                response = await self.client.post(self.url, headers=headers, json=payload)
+                if response.status_code not in RETRYABLE_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                delay = retry_after_seconds(response) or self._model_loading_delay(response)
+                error = httpx.HTTPStatusError(
+                    f"HuggingFace returned {response.status_code}",
+                    request=response.request,
+                    response=response,
+                )
+            except httpx.TransportError as e:
+                error = e
+
+            attempt += 1
+            if attempt > settings.http_max_retries or not _retry_budget.try_spend():
+                raise error
+            if delay is None:
+                delay = backoff_delay(attempt, settings.http_retry_base_delay, settings.http_retry_max_delay)
+            delay = min(delay, settings.http_retry_max_delay)
+            logger.warning(f"HuggingFace request failed ({error}), retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _model_loading_delay(response: httpx.Response) -> float | None:
+        """503 while a model is loading carries an ``estimated_time`` in seconds."""
+        if response.status_code != 503:
+            return None
+        try:
+            return float(response.json().get("estimated_time"))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    async def summarize(self, text: str) -> str:
+        data = await self._post({"inputs": text})
         if isinstance(data, list) and "summary_text" in data[0]:
             return data[0]["summary_text"]
-        return str(data)
\ No newline at end of file
+        return str(data)
+
+    async def summarize_batch(self, texts: list[str]) -> list[str | Exception]:
+        data = await self._post({"inputs": texts})
+        if not isinstance(data, list) or len(data) != len(texts):
+            raise ValueError(f"Unexpected batch response: {str(data)[:200]}")
+        return [
+            item["summary_text"] if isinstance(item, dict) and "summary_text" in item
+            else str(item)
+            for item in data
+        ]
@@ -0,0 +1,61 @@
+import time
+from domain.interfaces import ModelRepository
+from domain.tokens import estimate_tokens
+from metrics import BACKEND_ERRORS, BACKEND_SECONDS, TOKENS
+
+
+class InstrumentedRepository(ModelRepository):
+    """Records latency, errors and token counts of the wrapped backend."""
+
+    def __init__(self, repo: ModelRepository, name: str | None = None):
+        self.repo = repo
+        self.name = name or type(repo).__name__
+
+    def cache_params(self) -> dict:
+        return self.repo.cache_params()
+
+    def close(self):
+        self.repo.close()
+
+    def _record(self, method: str, started: float, texts: list[str], summaries: list):
+        BACKEND_SECONDS.labels(self.name, method).observe(time.monotonic() - started)
+        TOKENS.labels(self.name, "input").inc(sum(estimate_tokens(text) for text in texts))
+        TOKENS.labels(self.name, "output").inc(
+            sum(estimate_tokens(s) for s in summaries if isinstance(s, str))
+        )
+
+    async def summarize(self, text: str) -> str:
+        started = time.monotonic()
+        try:
+            summary = await self.repo.summarize(text)
+        except Exception:
+            BACKEND_ERRORS.labels(self.name).inc()
+            raise
+        self._record("summarize", started, [text], [summary])
+        return summary
+
+    async def summarize_batch(self, texts: list[str]) -> list[str | Exception]:
+        started = time.monotonic()
+        try:
+            summaries = await self.repo.summarize_batch(texts)
+        except Exception:
+            BACKEND_ERRORS.labels(self.name).inc(len(texts))
+            raise
+        BACKEND_ERRORS.labels(self.name).inc(sum(isinstance(s, Exception) for s in summaries))
+        self._record("summarize_batch", started, texts, summaries)
+        return summaries
+
+    async def summarize_stream(self, text: str):
+        started = time.monotonic()
+        parts = []
+        try:
+            async for part in self.repo.summarize_stream(text):
+                if not parts:
+                    first_token = time.monotonic() - started
+                    BACKEND_SECONDS.labels(self.name, "first_token").observe(first_token)
+                parts.append(part)
+                yield part
+        except Exception:
+            BACKEND_ERRORS.labels(self.name).inc()
+            raise
+        self._record("summarize_stream", started, [text], ["".join(parts)])
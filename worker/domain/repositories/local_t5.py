@@ -1,9 +1,186 @@
+import asyncio
+import multiprocessing
+import os
+import queue as queue_module
+from concurrent.futures import ProcessPoolExecutor
 from domain.interfaces import ModelRepository
+from settings import settings
+
+# Loaded once per pool process by _init_engine.
+_model = None
+_tokenizer = None
+
+
+def _init_engine(model_path: str, num_threads: int):
+    global _model, _tokenizer
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+    _tokenizer = AutoTokenizer.from_pretrained(model_path)
+    _model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
+    _model.eval()
+
+
+def _generate(texts: list[str], prefix: str, max_input_tokens: int,
+              max_new_tokens: int, num_beams: int) -> list[str]:
+    import torch
+
+    inputs = _tokenizer(
+        [prefix + text for text in texts],
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
+        max_length=max_input_tokens,
+    )
+    with torch.inference_mode():
+        output_ids = _model.generate(
+            **inputs, max_new_tokens=max_new_tokens, num_beams=num_beams
+        )
+    return [s.strip() for s in _tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
+
+
+def _generate_stream(text: str, queue, prefix: str, max_input_tokens: int, max_new_tokens: int):
+    import torch
+    from transformers import TextStreamer
+
+    class QueueStreamer(TextStreamer):
+        def on_finalized_text(self, text: str, stream_end: bool = False):
+            if text:
+                queue.put(text)
+
+    try:
+        inputs = _tokenizer(
+            [prefix + text], return_tensors="pt", truncation=True, max_length=max_input_tokens
+        )
+        streamer = QueueStreamer(_tokenizer, skip_special_tokens=True)
+        with torch.inference_mode():
+            # Streamers only support greedy/sampling decoding, not beam search.
+            _model.generate(**inputs, max_new_tokens=max_new_tokens, num_beams=1, streamer=streamer)
+    finally:
+        queue.put(None)
 
 
 class LocalT5Repository(ModelRepository):
-    """Local T5 model implementation."""
-    
+    """Local seq2seq (T5-style) model running on CPU in a process pool.
+
+    Each pool process loads the weights once and gets its own share of the
+    CPU threads, so generation never blocks the worker's event loop.
+    Requires the optional ``torch`` and ``transformers`` dependencies.
+    """
+
+    def __init__(
+        self,
+        model_path: str | None = None,
+        processes: int | None = None,
+        threads_per_process: int | None = None,
+        batch_size: int | None = None,
+        max_new_tokens: int | None = None,
+    ):
+        self.model_path = model_path or settings.local_t5_model_path
+        self.processes = processes or settings.local_t5_processes
+        self.threads_per_process = (
+            threads_per_process
+            or settings.local_t5_threads
+            or max(1, (os.cpu_count() or 1) // self.processes)
+        )
+        self.batch_size = batch_size or settings.local_t5_batch_size
+        self.prefix = settings.local_t5_prefix
+        self.max_input_tokens = settings.local_t5_max_input_tokens
+        self.max_new_tokens = max_new_tokens or settings.local_t5_max_new_tokens
+        self.num_beams = settings.local_t5_num_beams
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_engine,
+                initargs=(self.model_path, self.threads_per_process),
+            )
+        return self._executor
+
+    def _get_queue(self):
+        if self._manager is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+        return self._manager.Queue()
+
+    def cache_params(self) -> dict:
+        return {
+            "backend": "local_t5",
+            "model": self.model_path,
+            "prefix": self.prefix,
+            "max_input_tokens": self.max_input_tokens,
+            "max_new_tokens": self.max_new_tokens,
+            "num_beams": self.num_beams,
+        }
+
     async def summarize(self, text: str) -> str:
-        # TODO: Connect transformers pipeline for actual T5 summarization
-        return f"[LOCAL SUMMARY]: {text[:80]}..."
\ No newline at end of file
+        [summary] = await self.summarize_batch([text])
+        if isinstance(summary, Exception):
+            raise summary
+        return summary
+
+    async def summarize_stream(self, text: str):
+        loop = asyncio.get_running_loop()
+        queue = self._get_queue()
+        generation = loop.run_in_executor(
+            self._get_executor(),
+            _generate_stream,
+            text,
+            queue,
+            self.prefix,
+            self.max_input_tokens,
+            self.max_new_tokens,
+        )
+        while True:
+            try:
+                piece = await loop.run_in_executor(None, queue.get, True, 0.5)
+            except queue_module.Empty:
+                if generation.done():
+                    break
+                continue
+            if piece is None:
+                break
+            yield piece
+        await generation
+
+    async def summarize_batch(self, texts: list[str]) -> list[str | Exception]:
+        # Sort by length so each generate() call pads texts of similar size.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        chunks = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        outputs = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    executor,
+                    _generate,
+                    [texts[i] for i in chunk],
+                    self.prefix,
+                    self.max_input_tokens,
+                    self.max_new_tokens,
+                    self.num_beams,
+                )
+                for chunk in chunks
+            ),
+            return_exceptions=True,
+        )
+
+        results: list[str | Exception] = [None] * len(texts)
+        for chunk, output in zip(chunks, outputs):
+            for position, index in enumerate(chunk):
+                results[index] = output if isinstance(output, Exception) else output[position]
+        return results
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
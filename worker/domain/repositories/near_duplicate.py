@@ -0,0 +1,54 @@
+from domain.interfaces import ModelRepository
+from domain.near_duplicates import NearDuplicateIndex
+
+
+class NearDuplicateRepository(ModelRepository):
+    """Reuses the summary of an almost identical, already summarized text."""
+
+    def __init__(self, repo: ModelRepository, index: NearDuplicateIndex):
+        self.repo = repo
+        self.index = index
+
+    def cache_params(self) -> dict:
+        return self.repo.cache_params()
+
+    def close(self):
+        self.repo.close()
+
+    async def summarize(self, text: str) -> str:
+        params = self.repo.cache_params()
+        summary = await self.index.lookup(text, params)
+        if summary is not None:
+            return summary
+
+        summary = await self.repo.summarize(text)
+        await self.index.add(text, params, summary)
+        return summary
+
+    async def summarize_stream(self, text: str):
+        params = self.repo.cache_params()
+        summary = await self.index.lookup(text, params)
+        if summary is not None:
+            yield summary
+            return
+
+        parts = []
+        async for part in self.repo.summarize_stream(text):
+            parts.append(part)
+            yield part
+        await self.index.add(text, params, "".join(parts).strip())
+
+    async def summarize_batch(self, texts: list[str]) -> list[str | Exception]:
+        params = self.repo.cache_params()
+        results: list[str | Exception | None] = [
+            await self.index.lookup(text, params) for text in texts
+        ]
+
+        missing = [i for i, summary in enumerate(results) if summary is None]
+        if missing:
+            summaries = await self.repo.summarize_batch([texts[i] for i in missing])
+            for i, summary in zip(missing, summaries):
+                results[i] = summary
+                if not isinstance(summary, Exception):
+                    await self.index.add(texts[i], params, summary)
+        return results
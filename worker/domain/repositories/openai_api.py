@@ -2,6 +2,11 @@ from openai import AsyncOpenAI
 from domain.interfaces import ModelRepository
 from settings import settings
 
+SYSTEM_PROMPT = (
+    "You are a text summarization assistant. "
+    "Summarize the input text clearly and concisely in the same language."
+)
+
 
 class OpenAIRepository(ModelRepository):
     """OpenAI API implementation for text summarization."""
@@ -9,20 +14,42 @@ class OpenAIRepository(ModelRepository):
     def __init__(self, model_name: str | None = None):
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.model = model_name or settings.openai_model_name
+        self.max_tokens = 300
+        self.temperature = 0.3
+
+    def cache_params(self) -> dict:
+        return {
+            "backend": "openai",
+            "model": self.model,
+            "system_prompt": SYSTEM_PROMPT,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+        }
+
+    def _messages(self, text: str) -> list[dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": text},
+        ]
 
     async def summarize(self, text: str) -> str:
-        system_prompt = (
-            "You are a text summarization assistant. "
-            "Summarize the input text clearly and concisely in the same language."
-        )
         completion = await self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text},
-            ],
-            max_tokens=300,
-            temperature=0.3,
+            messages=self._messages(text),
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
         )
 
         return completion.choices[0].message.content.strip()
+
+    async def summarize_stream(self, text: str):
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(text),
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from domain.interfaces import ModelRepository
+
+logger = logging.getLogger(__name__)
+
+
+class BackendHealth:
+    """Rolling latency and error statistics plus circuit breaker state for one backend.
+
+    The circuit opens after ``failure_threshold`` consecutive failures. Once
+    ``reset_timeout`` seconds have passed the backend is tried again; a
+    success closes the circuit and another failure opens it for a new period.
+    """
+
+    def __init__(self, alpha: float, window: int, failure_threshold: int, reset_timeout: float):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+
+    def _update_latency(self, seconds: float):
+        self.latency = seconds if self.latency is None else (
+            self.alpha * seconds + (1 - self.alpha) * self.latency
+        )
+        self.latencies.append(seconds)
+
+    def record_success(self, seconds: float):
+        self._update_latency(seconds)
+        self.error_rate *= 1 - self.alpha
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def record_abandoned(self, seconds: float):
+        """A request cancelled after ``seconds`` took at least that long."""
+        self._update_latency(seconds)
+
+    @property
+    def available(self) -> bool:
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def p95(self) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def score(self) -> float:
+        """Expected time to a successful response; untried backends score 0 so they get sampled."""
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(1e-3, 1 - self.error_rate)
+
+
+class RouterRepository(ModelRepository):
+    """Routes each request to the healthiest of several backends.
+
+    Backends are ranked by latency EWMA adjusted for their error rate, and
+    those with an open circuit are skipped. If the chosen backend has not
+    answered within its p95 latency, the request is hedged to the next
+    backend and whichever answers first wins; the other call is cancelled.
+    A failed call falls through to the next backend, so one provider being
+    down does not fail the task.
+    """
+
+    def __init__(
+        self,
+        backends: dict[str, ModelRepository],
+        ewma_alpha: float = 0.2,
+        latency_window: int = 100,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedge_enabled: bool = True,
+        hedge_min_delay: float = 0.5,
+        hedge_default_delay: float = 5.0,
+    ):
+        if not backends:
+            raise ValueError("RouterRepository needs at least one backend")
+        self.backends = backends
+        self.health = {
+            name: BackendHealth(ewma_alpha, latency_window, failure_threshold, reset_timeout)
+            for name in backends
+        }
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+
+    def cache_params(self) -> dict:
+        # Backends are interchangeable here, so a summary from any of them is reusable.
+        return {"backend": "router", "backends": sorted(self.backends)}
+
+    def close(self):
+        for backend in self.backends.values():
+            backend.close()
+
+    def ranked_backends(self) -> list[str]:
+        """Backend names in the order they should be tried."""
+        available = [name for name in self.backends if self.health[name].available]
+        if not available:
+            # Every circuit is open: try the one that has been resting longest.
+            return sorted(self.backends, key=lambda name: self.health[name].opened_at)
+        return sorted(available, key=lambda name: self.health[name].score())
+
+    def hedge_delay(self, name: str) -> float:
+        p95 = self.health[name].p95()
+        return self.hedge_default_delay if p95 is None else max(self.hedge_min_delay, p95)
+
+    async def _call(self, name: str, text: str) -> str:
+        health = self.health[name]
+        started = time.monotonic()
+        try:
+            summary = await self.backends[name].summarize(text)
+        except asyncio.CancelledError:
+            health.record_abandoned(time.monotonic() - started)
+            raise
+        except Exception as e:
+            health.record_failure()
+            if not health.available:
+                logger.warning(f"Circuit opened for backend {name}: {e}")
+            raise
+        health.record_success(time.monotonic() - started)
+        return summary
+
+    async def summarize(self, text: str) -> str:
+        candidates = self.ranked_backends()
+        running: dict[asyncio.Task, str] = {}
+        hedged = not self.hedge_enabled
+        last_error: Exception | None = None
+
+        def launch():
+            name = candidates.pop(0)
+            running[asyncio.create_task(self._call(name, text))] = name
+            return name
+
+        primary = launch()
+        try:
+            while running:
+                timeout = None
+                if not hedged and candidates:
+                    timeout = self.hedge_delay(primary)
+                done, _pending = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    logger.info(f"Backend {primary} slower than {timeout:.2f}s, hedging to {launch()}")
+                    continue
+                winners = []
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        winners.append(task)
+                    else:
+                        last_error = task.exception()
+                        logger.warning(f"Backend {name} failed: {last_error}")
+                if winners:
+                    return winners[0].result()
+                if not running and candidates:
+                    primary = launch()
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def summarize_stream(self, text: str):
+        # A stream cannot be hedged once pieces have been yielded, but a
+        # backend that fails before producing anything falls through.
+        last_error: Exception | None = None
+        for name in self.ranked_backends():
+            health = self.health[name]
+            started = time.monotonic()
+            produced = False
+            try:
+                async for piece in self.backends[name].summarize_stream(text):
+                    produced = True
+                    yield piece
+            except Exception as e:
+                health.record_failure()
+                if produced:
+                    raise
+                last_error = e
+                logger.warning(f"Backend {name} failed: {e}")
+                continue
+            health.record_success(time.monotonic() - started)
+            return
+        raise last_error
@@ -0,0 +1,103 @@
+import asyncio
+from collections import OrderedDict, deque
+
+
+class FairQueue:
+    """Prefetched task entries, handed out fairly across priority lanes and tenants.
+
+    Lanes are served by deficit round robin: while several lanes have work,
+    each gets turns in proportion to its weight, so a weight of 8 for
+    ``interactive`` against 1 for ``batch`` gives interactive tasks about 8
+    of every 9 free slots however deep the batch backlog is. Within a lane,
+    tenants take turns one task at a time, and a tenant already running
+    ``tenant_cap`` tasks is skipped until one of them finishes.
+    """
+
+    def __init__(self, lane_weights: dict[str, int], prefetch: int, tenant_cap: int | None = None):
+        self.lane_weights = lane_weights
+        self.prefetch = prefetch
+        self.tenant_cap = tenant_cap
+        self._queues: dict[str, OrderedDict[str, deque]] = {lane: OrderedDict() for lane in lane_weights}
+        self._buffered = {lane: 0 for lane in lane_weights}
+        self._deficit = {lane: 0 for lane in lane_weights}
+        self._lanes = deque(lane_weights)
+        self._active: dict[str, int] = {}
+        self._ready = asyncio.Event()
+        self._room = asyncio.Event()
+
+    def buffered(self, lane: str) -> int:
+        return self._buffered[lane]
+
+    def room(self, lane: str) -> int:
+        """How many more entries may be prefetched for ``lane``."""
+        return max(0, self.prefetch - self._buffered[lane])
+
+    def active(self, tenant: str) -> int:
+        return self._active.get(tenant, 0)
+
+    def put(self, lane: str, tenant: str, item):
+        self._queues[lane].setdefault(tenant, deque()).append(item)
+        self._buffered[lane] += 1
+        self._ready.set()
+
+    def release(self, tenant: str):
+        """Mark one of ``tenant``'s tasks as finished."""
+        self._active[tenant] -= 1
+        if not self._active[tenant]:
+            del self._active[tenant]
+        self._ready.set()
+
+    async def get(self) -> tuple[str, object]:
+        """Wait for the next entry to run and return ``(tenant, item)``.
+
+        The caller must ``release(tenant)`` once the task is done.
+        """
+        while True:
+            self._ready.clear()
+            picked = self._pop()
+            if picked is not None:
+                return picked
+            await self._ready.wait()
+
+    async def wait_for_room(self):
+        """Wait until at least one lane can prefetch more entries."""
+        while True:
+            self._room.clear()
+            if any(self.room(lane) for lane in self._queues):
+                return
+            await self._room.wait()
+
+    def _next_tenant(self, lane: str) -> str | None:
+        tenants = self._queues[lane]
+        for tenant in tenants:
+            if self.tenant_cap is None or self.active(tenant) < self.tenant_cap:
+                tenants.move_to_end(tenant)
+                return tenant
+        return None
+
+    def _pop(self) -> tuple[str, object] | None:
+        for _ in range(len(self._lanes)):
+            lane = self._lanes[0]
+            tenant = self._next_tenant(lane)
+            if tenant is None:
+                # Nothing runnable: the lane gives up its turn and its credit.
+                self._deficit[lane] = 0
+                self._lanes.rotate(-1)
+                continue
+            if self._deficit[lane] < 1:
+                self._deficit[lane] += self.lane_weights[lane]
+            self._deficit[lane] -= 1
+            if self._deficit[lane] < 1:
+                self._lanes.rotate(-1)
+            return tenant, self._take(lane, tenant)
+        return None
+
+    def _take(self, lane: str, tenant: str):
+        entries = self._queues[lane][tenant]
+        item = entries.popleft()
+        if not entries:
+            del self._queues[lane][tenant]
+        self._buffered[lane] -= 1
+        self._active[tenant] = self.active(tenant) + 1
+        self._room.set()
+        return item
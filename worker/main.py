@@ -1,33 +1,164 @@
 import asyncio
 import logging
-from redis_client import subscribe_tasks, publish_result
-from domain.factory import get_repository
+import signal
+import time
+from prometheus_client import start_http_server
+from redis_client import (
+    redis_client, subscribe_tasks, subscribe_fast_tasks, publish_result, publish_event, load_text,
+    TASK_STREAMS,
+)
+from domain.factory import decorate_repository, get_repository
+from domain.repositories import ExtractiveRepository, InstrumentedRepository
+from domain.repositories.base import close_http_clients
+from batcher import MicroBatcher
+from fair_queue import FairQueue
+from metrics import IN_FLIGHT, PREFETCHED, QUEUE_WAIT_SECONDS, TASK_ERRORS, TASK_SECONDS
+from pipeline import MapReduceSummarizer
+from scheduler import TaskScheduler
+from settings import settings
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-repo = get_repository()
+repo = decorate_repository(get_repository(), redis_client)
+
+pipeline = MapReduceSummarizer(
+    repo,
+    max_direct_tokens=settings.pipeline_max_direct_tokens,
+    chunk_tokens=settings.pipeline_chunk_tokens,
+    concurrency=settings.pipeline_concurrency,
+)
+
+# Answers degraded tasks without the model backend.
+fast_repo = InstrumentedRepository(ExtractiveRepository(), "extractive")
+
+batcher = None
+if settings.batch_max_size > 1:
+    batcher = MicroBatcher(
+        repo,
+        max_batch_size=settings.batch_max_size,
+        max_wait_ms=settings.batch_max_wait_ms,
+        length_buckets=settings.batch_length_buckets,
+    )
+
+
+async def stream_summary(task_id: str, text: str) -> str:
+    """Publish the summary piece by piece as ``partial`` events and return it whole."""
+    parts = []
+    async for delta in repo.summarize_stream(text):
+        await publish_event({"event": "partial", "task_id": task_id, "seq": len(parts), "delta": delta})
+        parts.append(delta)
+    return "".join(parts).strip()
+
+
+def new_result(message: dict) -> dict:
+    # Trace fields travel back with the result so the gateway can report the breakdown.
+    result = {"task_id": message["task_id"]}
+    for key in ("trace_id", "enqueued_at", "batch_id"):
+        if key in message:
+            result[key] = message[key]
+    return result
+
+
+async def handle_fast_tasks(messages: list[dict]):
+    """Summarize a batch of degraded tasks with one extractive pass."""
+    texts = await asyncio.gather(*(load_text(m) for m in messages), return_exceptions=True)
+    summaries = iter(await fast_repo.summarize_batch([t for t in texts if isinstance(t, str)]))
+    for message, text in zip(messages, texts):
+        summary = next(summaries) if isinstance(text, str) else text
+        result = new_result(message)
+        result["degraded"] = True
+        if isinstance(summary, Exception):
+            TASK_ERRORS.inc()
+            summary = f"Error: {summary}"
+        result["summary"] = summary
+        await publish_result(result)
 
 
 async def handle_task(message: dict):
     task_id = message["task_id"]
-    text = message["text"]
-    logger.info(f"Worker received task {task_id}")
+    started = time.monotonic()
+    timings = {}
+    if "enqueued_at" in message:
+        timings["queue_wait"] = max(0.0, time.time() - message["enqueued_at"])
+        lane = message.get("priority", "interactive")
+        QUEUE_WAIT_SECONDS.labels(lane).observe(timings["queue_wait"])
+    logger.info(f"Worker received task {task_id} (trace {message.get('trace_id')})")
 
+    result = new_result(message)
     try:
-        summary = await repo.summarize(text)
-        await publish_result({"task_id": task_id, "summary": summary, "text": text})
+        stage_started = time.monotonic()
+        text = await load_text(message)
+        timings["load_text"] = time.monotonic() - stage_started
+
+        stage_started = time.monotonic()
+        if pipeline.needs_split(text):
+            summary = await pipeline.summarize(text)
+        elif settings.stream_partials:
+            summary = await stream_summary(task_id, text)
+        elif batcher is not None:
+            summary = await batcher.summarize(text)
+        else:
+            summary = await repo.summarize(text)
+        timings["summarize"] = time.monotonic() - stage_started
+        result["summary"] = summary
         logger.info(f"Worker finished task {task_id}")
     except Exception as e:
-        await publish_result({"task_id": task_id, "summary": f"Error: {str(e)}"})
+        TASK_ERRORS.inc()
+        result["summary"] = f"Error: {str(e)}"
         logger.error(f"Worker failed task {task_id}: {e}")
 
+    result["timings"] = timings
+    await publish_result(result)
+    TASK_SECONDS.observe(time.monotonic() - started)
+
 
 async def main():
-    logger.info("Worker started and waiting for tasks...")
-    await subscribe_tasks(handle_task)
+    scheduler = TaskScheduler(settings.worker_concurrency)
+    fair_queue = FairQueue(
+        {lane: settings.task_lane_weights.get(lane, 1) for lane in TASK_STREAMS},
+        prefetch=settings.task_prefetch,
+        tenant_cap=settings.tenant_max_concurrency,
+    )
+    IN_FLIGHT.set_function(lambda: scheduler.in_flight)
+    for lane in TASK_STREAMS:
+        PREFETCHED.labels(lane).set_function(lambda lane=lane: fair_queue.buffered(lane))
+    if settings.metrics_port:
+        try:
+            start_http_server(settings.metrics_port)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on port {settings.metrics_port}: {e}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(
+        f"Worker started with concurrency {scheduler.concurrency} and waiting for tasks..."
+    )
+    readers = [asyncio.create_task(subscribe_tasks(handle_task, scheduler, fair_queue))]
+    if settings.fast_lane_enabled:
+        readers.append(asyncio.create_task(subscribe_fast_tasks(handle_fast_tasks)))
+    stopper = asyncio.create_task(stop.wait())
+    await asyncio.wait({*readers, stopper}, return_when=asyncio.FIRST_COMPLETED)
+
+    stopper.cancel()
+    for reader in readers:
+        reader.cancel()
+    try:
+        for reader in readers:
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+    finally:
+        logger.info("Worker stopping, draining in-flight tasks...")
+        await scheduler.drain(settings.shutdown_timeout)
+        await close_http_clients()
+        repo.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,30 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Model calls range from milliseconds (cache, extractive) to minutes (long documents).
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "worker_queue_wait_seconds", "Time from task submission to a worker starting it.",
+    ["lane"], buckets=SLOW_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    "worker_task_seconds", "Time a worker spends on one task, including publishing the result.",
+    buckets=SLOW_BUCKETS,
+)
+BACKEND_SECONDS = Histogram(
+    "worker_backend_seconds", "Latency of model backend calls.",
+    ["backend", "method"], buckets=SLOW_BUCKETS,
+)
+
+IN_FLIGHT = Gauge("worker_tasks_in_flight", "Tasks this worker is running.")
+PREFETCHED = Gauge("worker_tasks_prefetched", "Task entries read ahead and waiting locally.", ["lane"])
+
+TOKENS = Counter(
+    "worker_tokens_total", "Estimated tokens sent to and received from backends.",
+    ["backend", "direction"],
+)
+BACKEND_ERRORS = Counter("worker_backend_errors_total", "Failed backend calls.", ["backend"])
+TASK_ERRORS = Counter("worker_task_errors_total", "Tasks that ended with an error result.")
+CACHE_LOOKUPS = Counter(
+    "worker_cache_lookups_total", "Summary cache lookups by outcome.", ["cache", "result"]
+)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import re
+from domain.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def _split_long_sentence(sentence: str, max_tokens: int) -> list[str]:
+    max_chars = max_tokens * 4
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """Split text into chunks of at most ``max_tokens``.
+
+    Chunks break at paragraph boundaries where possible, then at sentence
+    boundaries. Only a single sentence longer than the budget is cut mid-sentence.
+    """
+    units: list[tuple[int, str]] = []
+    for paragraph_no, paragraph in enumerate(_PARAGRAPH_BREAK.split(text)):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append((paragraph_no, paragraph))
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            for piece in _split_long_sentence(sentence, max_tokens):
+                units.append((paragraph_no, piece))
+
+    chunks: list[str] = []
+    current = ""
+    current_paragraph = None
+    for paragraph_no, piece in units:
+        separator = " " if paragraph_no == current_paragraph else "\n\n"
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if current and estimate_tokens(candidate) > max_tokens:
+            chunks.append(current)
+            candidate = piece
+        current = candidate
+        current_paragraph = paragraph_no
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class MapReduceSummarizer:
+    """Summarizes documents that exceed the backend's input budget.
+
+    The text is split into token-budgeted chunks that are summarized in
+    parallel (at most ``concurrency`` at a time). The chunk summaries are
+    then merged and summarized again, level by level, until they fit into
+    one final call. Chunk calls go through ``repo``; when it is the cached
+    repository, retrying a partially failed document only redoes the chunks
+    that failed.
+    """
+
+    def __init__(self, repo, max_direct_tokens: int, chunk_tokens: int,
+                 concurrency: int):
+        self.repo = repo
+        self.max_direct_tokens = max_direct_tokens
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = concurrency
+
+    def needs_split(self, text: str) -> bool:
+        return estimate_tokens(text) > self.max_direct_tokens
+
+    async def summarize(self, text: str) -> str:
+        if not self.needs_split(text):
+            return await self.repo.summarize(text)
+
+        chunks = split_into_chunks(text, self.chunk_tokens)
+        logger.info(f"Split document into {len(chunks)} chunks")
+        summaries = await self._map(chunks, stage="map")
+
+        level = 1
+        while True:
+            combined = "\n\n".join(summaries)
+            if not self.needs_split(combined) or len(summaries) == 1:
+                return await self.repo.summarize(combined)
+            groups = split_into_chunks(combined, self.chunk_tokens)
+            if len(groups) >= len(summaries):
+                # Chunk summaries are not shrinking; summarize what we have.
+                return await self.repo.summarize(combined)
+            logger.info(f"Reducing {len(summaries)} summaries into {len(groups)} (level {level})")
+            summaries = await self._map(groups, stage=f"reduce-{level}")
+            level += 1
+
+    async def _map(self, texts: list[str], stage: str) -> list[str]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(text: str) -> str:
+            async with semaphore:
+                return await self.repo.summarize(text)
+
+        results = await asyncio.gather(*(run(text) for text in texts), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.error(f"{len(failures)} of {len(texts)} chunks failed at stage {stage}")
+            raise failures[0]
+        return results
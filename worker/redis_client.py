@@ -1,20 +1,271 @@
+import asyncio
 import json
+import logging
+import os
+import socket
+import time
 import redis.asyncio as redis
+import zstandard
 from settings import settings
 
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+logger = logging.getLogger(__name__)
 
-TASK_CHANNEL = "tasks"
-RESULT_CHANNEL = "results"
+# No socket timeout: blocking stream reads wait longer than redis-py's default of 5 s.
+redis_client = redis.from_url(settings.redis_url, decode_responses=True, socket_timeout=None)
+# Compressed text blobs are binary, so they go through a client that does not decode.
+blob_client = redis.from_url(settings.redis_url)
 
+# Priority lanes, each backed by its own stream.
+TASK_STREAMS = {"interactive": "tasks", "batch": "tasks:batch"}
+_LANES = {stream: lane for lane, stream in TASK_STREAMS.items()}
+# Degraded tasks the gateway shed from the backlog; answered by the extractive backend.
+FAST_STREAM = "tasks:fast"
+TASK_GROUP = "workers"
+RESULT_STREAM = "results"
+# Entries that failed ``task_max_deliveries`` times, kept for inspection.
+DEAD_LETTER_STREAM = "tasks:dead"
+EVENT_CHANNEL = "events"
+BLOB_PREFIX = "blob:"
+DEFAULT_TENANT = "default"
 
-async def subscribe_tasks(callback):
-    pubsub = redis_client.pubsub()
-    await pubsub.subscribe(TASK_CHANNEL)
-    async for message in pubsub.listen():
-        if message["type"] == "message":
-            await callback(json.loads(message["data"]))
+CONSUMER_NAME = settings.worker_name or f"{socket.gethostname()}-{os.getpid()}"
+
+# Entries this consumer has read but not yet acknowledged, per stream.
+_held: dict[str, set[str]] = {stream: set() for stream in TASK_STREAMS.values()}
+
+_decompressor = zstandard.ZstdDecompressor()
+
+
+async def load_text(message: dict) -> str:
+    """Return the task text, fetching it from the blob store if it was sent by reference.
+
+    Raises ``LookupError`` if the referenced blob has expired.
+    """
+    if "text" in message:
+        return message["text"]
+    data = await blob_client.get(f"{BLOB_PREFIX}{message['text_ref']}")
+    if data is None:
+        raise LookupError(f"Text {message['text_ref']} is no longer available")
+    return _decompressor.decompress(data).decode("utf-8")
+
+
+async def ensure_task_group(stream: str):
+    """Create the worker consumer group (and the stream) if it does not exist yet."""
+    try:
+        await redis_client.xgroup_create(stream, TASK_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def _process_entry(callback, stream: str, entry_id: str, fields: dict):
+    try:
+        await callback(json.loads(fields["data"]))
+    except Exception as e:
+        # Leave the entry pending so it gets reclaimed and retried.
+        logger.error(f"Task entry {entry_id} failed, leaving it pending: {e}")
+        return
+    finally:
+        _held[stream].discard(entry_id)
+    await redis_client.xack(stream, TASK_GROUP, entry_id)
+
+
+def _enqueue(fair_queue, lane: str, entry_id: str, fields: dict):
+    stream = TASK_STREAMS[lane]
+    _held[stream].add(entry_id)
+    fair_queue.put(lane, fields.get("tenant", DEFAULT_TENANT), (stream, entry_id, fields))
+
+
+async def _touch_held_entries():
+    """Reset the idle time of entries still waiting here so no other worker reclaims them."""
+    for stream, entry_ids in _held.items():
+        if entry_ids:
+            await redis_client.xclaim(
+                stream, TASK_GROUP, CONSUMER_NAME,
+                min_idle_time=0, message_ids=list(entry_ids), justid=True,
+            )
+
+
+async def _keep_held_entries():
+    """Touch held entries every third of ``task_reclaim_idle_ms``.
+
+    Runs beside the reader so entries stay claimed while it is blocked on a
+    full fair queue.
+    """
+    interval = settings.task_reclaim_idle_ms / 1000 / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await _touch_held_entries()
+        except redis.RedisError as e:
+            logger.error(f"Failed to touch held task entries: {e}")
+
+
+async def _dead_letter_exhausted(stream: str, entries: list) -> list:
+    """Move entries delivered more than ``task_max_deliveries`` times out of ``stream``.
+
+    Each goes to ``DEAD_LETTER_STREAM`` with its delivery count, its task
+    is answered with a ``failed`` result, and the entry is acknowledged.
+    Returns the entries that may be retried.
+    """
+    if not entries:
+        return entries
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for entry_id, _fields in entries:
+            pipe.xpending_range(stream, TASK_GROUP, min=entry_id, max=entry_id, count=1)
+        pending = await pipe.execute()
+    deliveries = {
+        info[0]["message_id"]: info[0]["times_delivered"] for info in pending if info
+    }
+
+    retry = []
+    for entry_id, fields in entries:
+        delivered = deliveries.get(entry_id, 0)
+        if delivered <= settings.task_max_deliveries:
+            retry.append((entry_id, fields))
+            continue
+        attempts = delivered - 1
+        logger.error(f"Task entry {entry_id} from {stream} failed {attempts} times, giving up")
+        try:
+            message = json.loads(fields["data"])
+        except (KeyError, ValueError):
+            message = None
+        if isinstance(message, dict) and "task_id" in message:
+            result = {
+                key: message[key] for key in ("task_id", "trace_id", "batch_id") if key in message
+            }
+            result["status"] = "failed"
+            result["summary"] = f"Error: task failed after {attempts} attempts"
+            await publish_result(result)
+        await redis_client.xadd(
+            DEAD_LETTER_STREAM,
+            {**fields, "stream": stream, "entry_id": entry_id, "deliveries": delivered},
+            maxlen=settings.dead_letter_maxlen,
+            approximate=True,
+        )
+        await redis_client.xack(stream, TASK_GROUP, entry_id)
+    return retry
+
+
+async def reclaim_stale_tasks(fair_queue):
+    """Take over entries left pending by consumers that stopped acknowledging them."""
+    for lane, stream in TASK_STREAMS.items():
+        start_id = "0-0"
+        while fair_queue.room(lane):
+            # Redis 7 adds a third element (deleted ids); 6.2 returns two.
+            start_id, entries, *_deleted = await redis_client.xautoclaim(
+                stream,
+                TASK_GROUP,
+                CONSUMER_NAME,
+                min_idle_time=settings.task_reclaim_idle_ms,
+                start_id=start_id,
+                count=fair_queue.room(lane),
+            )
+            for entry_id, fields in await _dead_letter_exhausted(stream, entries):
+                logger.info(f"Reclaimed stale task entry {entry_id} from {stream}")
+                _enqueue(fair_queue, lane, entry_id, fields)
+            if start_id in ("0-0", b"0-0"):
+                break
+
+
+async def _dispatch(callback, scheduler, fair_queue):
+    async def run(tenant: str, stream: str, entry_id: str, fields: dict):
+        try:
+            await _process_entry(callback, stream, entry_id, fields)
+        finally:
+            fair_queue.release(tenant)
+
+    while True:
+        await scheduler.wait_for_slot()
+        tenant, (stream, entry_id, fields) = await fair_queue.get()
+        await scheduler.submit(run(tenant, stream, entry_id, fields))
+
+
+async def subscribe_tasks(callback, scheduler, fair_queue):
+    """Feed stream entries to ``callback`` through ``fair_queue`` and ``scheduler``.
+
+    Each lane prefetches at most ``fair_queue.prefetch`` entries, so a
+    saturated worker leaves the rest in the streams for other consumers,
+    and a deep batch backlog never keeps interactive entries from being read.
+    """
+    for stream in TASK_STREAMS.values():
+        await ensure_task_group(stream)
+    dispatcher = asyncio.create_task(_dispatch(callback, scheduler, fair_queue))
+    keeper = asyncio.create_task(_keep_held_entries())
+    try:
+        next_reclaim = 0.0
+        while True:
+            if time.monotonic() >= next_reclaim:
+                await reclaim_stale_tasks(fair_queue)
+                next_reclaim = time.monotonic() + settings.task_reclaim_interval_seconds
+            await fair_queue.wait_for_room()
+            lanes = [lane for lane in TASK_STREAMS if fair_queue.room(lane)]
+            response = await redis_client.xreadgroup(
+                TASK_GROUP,
+                CONSUMER_NAME,
+                {TASK_STREAMS[lane]: ">" for lane in lanes},
+                count=min(settings.task_read_count, *(fair_queue.room(lane) for lane in lanes)),
+                block=settings.task_block_ms,
+            )
+            for stream, entries in response or []:
+                for entry_id, fields in entries:
+                    _enqueue(fair_queue, _LANES[stream], entry_id, fields)
+    finally:
+        dispatcher.cancel()
+        keeper.cancel()
+
+
+async def subscribe_fast_tasks(callback):
+    """Hand fast-lane messages to ``callback(messages)`` in batches, then acknowledge them.
+
+    Fast-lane tasks are cheap and must not wait behind the model backend, so
+    they bypass the scheduler and the fair queue. Entries left pending by a
+    worker that stopped are taken over after ``task_reclaim_idle_ms``.
+    """
+    await ensure_task_group(FAST_STREAM)
+    next_reclaim = 0.0
+    while True:
+        entries = []
+        if time.monotonic() >= next_reclaim:
+            _start_id, entries, *_deleted = await redis_client.xautoclaim(
+                FAST_STREAM,
+                TASK_GROUP,
+                CONSUMER_NAME,
+                min_idle_time=settings.task_reclaim_idle_ms,
+                count=settings.fast_batch_size,
+            )
+            if not entries:
+                next_reclaim = time.monotonic() + settings.task_reclaim_interval_seconds
+            entries = await _dead_letter_exhausted(FAST_STREAM, entries)
+        if not entries:
+            response = await redis_client.xreadgroup(
+                TASK_GROUP,
+                CONSUMER_NAME,
+                {FAST_STREAM: ">"},
+                count=settings.fast_batch_size,
+                block=settings.task_block_ms,
+            )
+            entries = [entry for _stream, batch in response or [] for entry in batch]
+        if not entries:
+            continue
+        try:
+            await callback([json.loads(fields["data"]) for _entry_id, fields in entries])
+        except Exception as e:
+            logger.error(f"Fast-lane batch of {len(entries)} failed, leaving it pending: {e}")
+            continue
+        await redis_client.xack(FAST_STREAM, TASK_GROUP, *(entry_id for entry_id, _ in entries))
 
 
 async def publish_result(result_data: dict):
-    await redis_client.publish(RESULT_CHANNEL, json.dumps(result_data))
\ No newline at end of file
+    """Queue a final result for exactly one gateway instance to persist."""
+    await redis_client.xadd(
+        RESULT_STREAM,
+        {"data": json.dumps(result_data)},
+        maxlen=settings.result_stream_maxlen,
+        approximate=True,
+    )
+
+
+async def publish_event(event: dict):
+    """Broadcast a transient event (such as a partial summary) to every gateway."""
+    await redis_client.publish(EVENT_CHANNEL, json.dumps(event))
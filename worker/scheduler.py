@@ -0,0 +1,60 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskScheduler:
+    """Runs up to ``concurrency`` task coroutines at the same time.
+
+    ``submit`` blocks while every slot is busy, which is what holds the
+    queue reader back when the worker is saturated.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._running: set[asyncio.Task] = set()
+
+    @property
+    def free_slots(self) -> int:
+        return self.concurrency - len(self._running)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._running)
+
+    async def wait_for_slot(self):
+        """Wait until at least one slot is free without taking it."""
+        await self._slots.acquire()
+        self._slots.release()
+
+    async def submit(self, coro):
+        """Start ``coro`` as soon as a slot is free."""
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            coro.close()
+            raise
+        task = asyncio.create_task(coro)
+        self._running.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Scheduled task failed: {task.exception()}")
+
+    async def drain(self, timeout: float | None = None):
+        """Wait for in-flight tasks to finish, cancelling whatever outlives ``timeout``."""
+        if not self._running:
+            return
+        logger.info(f"Waiting for {len(self._running)} in-flight tasks to finish")
+        _done, pending = await asyncio.wait(set(self._running), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} tasks still running after {timeout}s")
+            await asyncio.gather(*pending, return_exceptions=True)
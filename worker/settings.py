@@ -4,10 +4,112 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     redis_url: str = "redis://redis:6379"
     huggingface_api_key: str | None = None
+    huggingface_model_name: str = "facebook/bart-large-cnn"
+    huggingface_rate_limit: float = 10.0
+    huggingface_rate_burst: int = 20
     openai_api_key: str | None = None
     openai_model_name: str = "gpt-4o-mini"
     model_backend: str = "openai"
 
+    # Offline backend with synthetic latency (model_backend=fake)
+    fake_latency_ms: float = 200.0
+    fake_latency_sigma: float = 0.5
+    fake_tokens_per_second: float = 50.0
+    fake_summary_words: int = 30
+    fake_error_rate: float = 0.0
+
+    # Extractive TextRank backend (model_backend=extractive)
+    extractive_max_sentences: int = 3
+    extractive_damping: float = 0.85
+    extractive_max_iterations: int = 50
+    extractive_tolerance: float = 1e-6
+
+    # Multi-backend routing (model_backend=router)
+    router_backends: list[str] = ["openai", "huggingface"]
+    router_ewma_alpha: float = 0.2
+    router_latency_window: int = 100
+    router_failure_threshold: int = 5
+    router_reset_timeout: float = 30.0
+    router_hedge_enabled: bool = True
+    router_hedge_min_delay: float = 0.5
+    router_hedge_default_delay: float = 5.0
+
+    # Shared HTTP client for API backends
+    http_max_connections: int = 50
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 60.0
+    http_max_retries: int = 4
+    http_retry_base_delay: float = 0.5
+    http_retry_max_delay: float = 30.0
+    http_retry_budget_ratio: float = 0.2
+
+    # Local seq2seq backend (model_backend=local_t5)
+    local_t5_model_path: str = "t5-small"
+    local_t5_prefix: str = "summarize: "
+    local_t5_processes: int = 1
+    local_t5_threads: int | None = None
+    local_t5_batch_size: int = 8
+    local_t5_max_input_tokens: int = 512
+    local_t5_max_new_tokens: int = 150
+    local_t5_num_beams: int = 2
+
+    # Summary cache
+    summary_cache_enabled: bool = True
+    summary_cache_max_entries: int = 1024
+    summary_cache_ttl_seconds: int = 7 * 24 * 3600
+
+    # Near-duplicate reuse: MinHash LSH index in Redis, consulted after the
+    # exact cache; a summary is reused at or above the Jaccard threshold
+    near_duplicate_enabled: bool = True
+    near_duplicate_threshold: float = 0.9
+    near_duplicate_num_perm: int = 128
+    near_duplicate_shingle_size: int = 3
+    near_duplicate_ttl_seconds: int = 7 * 24 * 3600
+    near_duplicate_min_words: int = 20
+    # Newest texts kept (and compared on lookup) per LSH bucket
+    near_duplicate_bucket_max_members: int = 32
+
+    # Prometheus metrics endpoint (None disables it)
+    metrics_port: int | None = 9100
+
+    # Concurrency
+    worker_concurrency: int = 5
+    shutdown_timeout: float = 30.0
+
+    # Publish partial summaries while the backend is still generating
+    stream_partials: bool = False
+
+    # Map-reduce for long documents (estimated tokens, ~4 chars per token)
+    pipeline_max_direct_tokens: int = 3000
+    pipeline_chunk_tokens: int = 1500
+    pipeline_concurrency: int = 4
+
+    # Micro-batching (disabled while batch_max_size is 1)
+    batch_max_size: int = 1
+    batch_max_wait_ms: float = 20.0
+    batch_length_buckets: list[int] = [512, 2048, 8192]
+
+    # Task stream consumption
+    worker_name: str | None = None
+    # Share of free slots each priority lane gets while several have work
+    task_lane_weights: dict[str, int] = {"interactive": 8, "batch": 1}
+    # Entries read ahead per lane for fair scheduling
+    task_prefetch: int = 10
+    # Most tasks one tenant may run at once on this worker (None = no cap)
+    tenant_max_concurrency: int | None = None
+    task_read_count: int = 10
+    task_block_ms: int = 5000
+    task_reclaim_idle_ms: int = 60000
+    task_reclaim_interval_seconds: float = 30.0
+    # Deliveries after which a failing entry goes to the dead-letter stream
+    task_max_deliveries: int = 5
+    dead_letter_maxlen: int = 100000
+    result_stream_maxlen: int = 100000
+
+    # Fast lane for tasks the gateway degraded under load (extractive backend)
+    fast_lane_enabled: bool = True
+    fast_batch_size: int = 100
+
     class Config:
         env_file = ".env"
 